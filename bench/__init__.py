@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+# note: this package is intentionally not part of the `iniherit`
+#       distribution; run the benchmarks from a source checkout, e.g.:
+#         python -m bench run --help
+#         python -m bench merge
+
+#------------------------------------------------------------------------------
+# end of $Id$
+#------------------------------------------------------------------------------
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Runs the iniherit benchmark suite, e.g.::
+
+  $ python -m bench run --depth 3 --fanout 4 --output before.json
+  ...make some changes...
+  $ python -m bench run --depth 3 --fanout 4 --output after.json
+  $ python -m bench compare before.json after.json
+
+The ``merge`` sub-command runs the `_apply` micro-benchmark from
+:mod:`bench.merge`.
+'''
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import json
+import shutil
+import timeit
+import platform
+import argparse
+import tempfile
+import subprocess
+
+from . import tree as T
+from .suites import SUITES
+
+#------------------------------------------------------------------------------
+def _commit():
+  try:
+    return subprocess.check_output(
+      ['git', 'rev-parse', '--short', 'HEAD'],
+      cwd=os.path.dirname(os.path.abspath(__file__)),
+      stderr=subprocess.STDOUT).decode('utf-8').strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+#------------------------------------------------------------------------------
+def run(options):
+  spec = T.TreeSpec(**dict(
+    (name, getattr(options, name)) for name in T.TreeSpec.PARAMS))
+  tmpdir = tempfile.mkdtemp(prefix='iniherit-bench-')
+  try:
+    tree = T.generate(tmpdir, spec)
+    results = dict()
+    for name, suite in SUITES:
+      if options.match and not re.search(options.match, name):
+        continue
+      func = suite(tree)
+      times = sorted(timeit.repeat(func, number=options.number, repeat=options.repeat))
+      times = [t / options.number for t in times]
+      results[name] = dict(
+        min    = times[0],
+        median = times[len(times) // 2],
+        max    = times[-1],
+      )
+      print('%-28s min %10.3f ms   median %10.3f ms' % (
+        name, times[0] * 1000, times[len(times) // 2] * 1000))
+  finally:
+    shutil.rmtree(tmpdir)
+  if options.output:
+    with open(options.output, 'w') as fp:
+      json.dump(dict(
+        commit  = _commit(),
+        python  = platform.python_version(),
+        spec    = spec.asdict(),
+        number  = options.number,
+        repeat  = options.repeat,
+        results = results,
+      ), fp, indent=2, sort_keys=True)
+  return 0
+
+#------------------------------------------------------------------------------
+def compare(options):
+  with open(options.before) as fp:
+    before = json.load(fp)
+  with open(options.after) as fp:
+    after = json.load(fp)
+  if before['spec'] != after['spec']:
+    print('warning: the benchmarks used different tree specs', file=sys.stderr)
+  print('%-28s %12s %12s %9s' % (
+    'benchmark', before.get('commit') or 'before', after.get('commit') or 'after', 'change'))
+  for name in sorted(set(before['results']) & set(after['results'])):
+    old = before['results'][name]['min']
+    new = after['results'][name]['min']
+    if old:
+      change = '%+8.1f%%' % (( new - old ) / old * 100,)
+    else:
+      # note: timings below the clock resolution can be zero
+      change = '%9s' % ('n/a',)
+    print('%-28s %9.3f ms %9.3f ms %s' % (name, old * 1000, new * 1000, change))
+  return 0
+
+#------------------------------------------------------------------------------
+def main(argv=None):
+  cli = argparse.ArgumentParser(prog='python -m bench')
+  subs = cli.add_subparsers(dest='command')
+  subs.required = True
+
+  sub = subs.add_parser('run', help='run the benchmarks')
+  sub.set_defaults(func=run)
+  defaults = T.TreeSpec()
+  sub.add_argument('--depth', type=int, default=defaults.depth)
+  sub.add_argument('--fanout', type=int, default=defaults.fanout)
+  sub.add_argument('--diamonds', type=int, default=defaults.diamonds)
+  sub.add_argument('--sections', type=int, default=defaults.sections)
+  sub.add_argument('--options', type=int, default=defaults.options)
+  sub.add_argument('--density', type=float, default=defaults.density)
+  sub.add_argument('--seed', type=int, default=defaults.seed)
+  sub.add_argument('-n', '--number', type=int, default=3,
+                   help='iterations per measurement [defaults to %(default)s]')
+  sub.add_argument('-r', '--repeat', type=int, default=5,
+                   help='number of measurements [defaults to %(default)s]')
+  sub.add_argument('-k', '--match', metavar='REGEX',
+                   help='only run benchmarks whose name matches REGEX')
+  sub.add_argument('-o', '--output', metavar='FILENAME',
+                   help='write the results as JSON to FILENAME')
+
+  sub = subs.add_parser('compare', help='compare two JSON results files')
+  sub.set_defaults(func=compare)
+  sub.add_argument('before')
+  sub.add_argument('after')
+
+  sub = subs.add_parser('merge', add_help=False,
+                        help='run the `_apply` merge micro-benchmark')
+  sub.set_defaults(func=None)
+
+  if argv is None:
+    argv = sys.argv[1:]
+  if argv[:1] == ['merge']:
+    from . import merge
+    return merge.main(argv[1:])
+  options = cli.parse_args(argv)
+  return options.func(options)
+
+#------------------------------------------------------------------------------
+if __name__ == '__main__':
+  sys.exit(main())
+
+#------------------------------------------------------------------------------
+# end of $Id$
+#------------------------------------------------------------------------------
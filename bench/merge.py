@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Benchmarks `IniheritMixin._apply` (the merge of one resolved parser
+into another) against the previous DEFAULT-detecting implementation,
+for a varying number of sections and options per section::
+
+  $ python -m bench.merge
+'''
+
+from __future__ import print_function
+
+import sys
+import timeit
+import argparse
+
+import iniherit
+from iniherit.parser import CP, _real_RawConfigParser
+
+#------------------------------------------------------------------------------
+def makeParser(sections, options, defaults):
+  ret = _real_RawConfigParser()
+  for idx in range(defaults):
+    ret.set(CP.DEFAULTSECT, 'default%d' % (idx,), 'value-%d' % (idx,))
+  for sidx in range(sections):
+    section = 'section%d' % (sidx,)
+    ret.add_section(section)
+    for oidx in range(options):
+      ret.set(section, 'option%d' % (oidx,), 'value-%d-%d' % (sidx, oidx))
+  return ret
+
+#------------------------------------------------------------------------------
+def legacy_apply(parser, src, dst):
+  # the pre-v0.4.0 implementation of `IniheritMixin._apply`
+  defsect = parser.IM_DEFAULTSECT
+  def super_(section, option, value):
+    if '%(SUPER' in value and dst.has_option(section, option):
+      return iniherit.interpolation.substitute_super(
+        value, dst.get(section, option))
+    return value
+  for option, value in src.items(defsect):
+    parser._im_setraw(dst, defsect, option, super_(defsect, option, value))
+  for section in src.sections():
+    if not dst.has_section(section):
+      dst.add_section(section)
+    for option, value in src.items(section):
+      if src.has_option(defsect, option) \
+          and value == src.get(defsect, option):
+        continue
+      parser._im_setraw(dst, section, option, super_(section, option, value))
+
+#------------------------------------------------------------------------------
+def indexed_apply(parser, src, dst):
+  parser._apply(src, dst)
+
+#------------------------------------------------------------------------------
+def measure(func, sections, options, defaults, repeat):
+  parser = iniherit.RawConfigParser()
+  src = makeParser(sections, options, defaults)
+  def run():
+    func(parser, src, _real_RawConfigParser())
+  return min(timeit.repeat(run, number=1, repeat=repeat))
+
+#------------------------------------------------------------------------------
+def main(argv=None):
+  cli = argparse.ArgumentParser(
+    description='Benchmark the inheritance merge (`_apply`).')
+  cli.add_argument(
+    '-s', '--sections', type=int, nargs='+', default=[10, 100, 1000])
+  cli.add_argument(
+    '-o', '--options', type=int, nargs='+', default=[10, 50])
+  cli.add_argument(
+    '-d', '--defaults', type=int, default=20)
+  cli.add_argument(
+    '-r', '--repeat', type=int, default=5)
+  options = cli.parse_args(argv)
+  print('%8s %8s %8s %12s %12s %8s' % (
+    'sections', 'options', 'defaults', 'legacy (ms)', 'indexed (ms)', 'speedup'))
+  for nsect in options.sections:
+    for nopt in options.options:
+      legacy = measure(legacy_apply, nsect, nopt, options.defaults, options.repeat)
+      indexed = measure(indexed_apply, nsect, nopt, options.defaults, options.repeat)
+      print('%8d %8d %8d %12.2f %12.2f %7.1fx' % (
+        nsect, nopt, options.defaults,
+        legacy * 1000, indexed * 1000, legacy / indexed))
+  return 0
+
+#------------------------------------------------------------------------------
+if __name__ == '__main__':
+  sys.exit(main())
+
+#------------------------------------------------------------------------------
+# end of $Id$
+#------------------------------------------------------------------------------
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+The individual benchmarks. Each benchmark is a function that takes a
+:class:`bench.tree.Tree` and returns a zero-argument callable that
+performs one iteration of the benchmarked operation.
+'''
+
+import six
+from six.moves import configparser as CP
+
+import iniherit
+import iniherit.cli
+import iniherit.mixin
+
+#------------------------------------------------------------------------------
+def _stdlib_parser():
+  return CP.ConfigParser() if six.PY3 else CP.SafeConfigParser()
+
+#------------------------------------------------------------------------------
+def read_iniherit(tree):
+  def run():
+    iniherit.ConfigParser().read(tree.root)
+  return run
+
+#------------------------------------------------------------------------------
+def read_stdlib(tree):
+  # the closest stdlib equivalent: read all files in flattened order
+  def run():
+    _stdlib_parser().read(tree.files)
+  return run
+
+#------------------------------------------------------------------------------
+def _get(parser, tree):
+  def run():
+    for section, option in tree.hotkeys:
+      try:
+        parser.get(section, option)
+      except CP.InterpolationError:
+        pass
+  return run
+
+#------------------------------------------------------------------------------
+def get_iniherit(tree):
+  parser = iniherit.ConfigParser()
+  parser.read(tree.root)
+  return _get(parser, tree)
+
+#------------------------------------------------------------------------------
+def get_iniherit_valuecache(tree):
+  parser = iniherit.ConfigParser(valuecache=True)
+  parser.read(tree.root)
+  return _get(parser, tree)
+
+#------------------------------------------------------------------------------
+def get_stdlib(tree):
+  parser = _stdlib_parser()
+  parser.read(tree.files)
+  return _get(parser, tree)
+
+#------------------------------------------------------------------------------
+def flatten(tree):
+  def run():
+    iniherit.cli.flatten(tree.root, six.StringIO())
+  return run
+
+#------------------------------------------------------------------------------
+def read_install_globally(tree):
+  def run():
+    iniherit.mixin.install_globally()
+    try:
+      _stdlib_parser().read(tree.root)
+    finally:
+      iniherit.mixin.uninstall_globally()
+  return run
+
+#------------------------------------------------------------------------------
+SUITES = (
+  ('read.iniherit',             read_iniherit),
+  ('read.stdlib',               read_stdlib),
+  ('read.install_globally',     read_install_globally),
+  ('get.iniherit',              get_iniherit),
+  ('get.iniherit.valuecache',   get_iniherit_valuecache),
+  ('get.stdlib',                get_stdlib),
+  ('flatten',                   flatten),
+)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+#------------------------------------------------------------------------------
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Generates synthetic iniherit configuration trees.
+'''
+
+import os
+import random
+
+#------------------------------------------------------------------------------
+class TreeSpec(object):
+  '''
+  The shape of a synthetic configuration tree:
+
+  * `depth`: the number of inheritance levels below the root.
+  * `fanout`: the number of files that each non-leaf file inherits.
+  * `diamonds`: the number of shared base files that every leaf file
+    inherits (i.e. each creates a diamond per pair of leaves).
+  * `sections`: the number of sections per file.
+  * `options`: the number of options per section.
+  * `density`: the fraction (0.0 - 1.0) of values that use
+    interpolation (``%(name)s``, ``%(ENV:...)s`` or ``%(SUPER)s``).
+  * `seed`: the seed of the random generator that picks the values.
+  '''
+
+  PARAMS = (
+    'depth', 'fanout', 'diamonds', 'sections', 'options', 'density', 'seed')
+
+  def __init__(self, depth=3, fanout=3, diamonds=1, sections=20,
+               options=10, density=0.2, seed=0):
+    self.depth    = depth
+    self.fanout   = fanout
+    self.diamonds = diamonds
+    self.sections = sections
+    self.options  = options
+    self.density  = density
+    self.seed     = seed
+
+  def asdict(self):
+    return dict((name, getattr(self, name)) for name in self.PARAMS)
+
+
+#------------------------------------------------------------------------------
+class Tree(object):
+  '''
+  A generated tree: `root` is the path of the root INI file, `files`
+  lists all files in "flattened" order (i.e. the order in which a
+  plain `ConfigParser.read()` would need to read them to approximate
+  the inheritance), and `hotkeys` is a list of ``(section, option)``
+  pairs that exist in the resolved configuration.
+  '''
+  def __init__(self, root, files, hotkeys):
+    self.root    = root
+    self.files   = files
+    self.hotkeys = hotkeys
+
+
+#------------------------------------------------------------------------------
+def _value(rand, spec, name, sidx, oidx):
+  if rand.random() >= spec.density:
+    return 'value-%s-%d-%d' % (name, sidx, oidx)
+  kind = rand.randrange(3)
+  if kind == 0:
+    return '%%(option%d)s/%s' % ((oidx + 1) % spec.options, name)
+  if kind == 1:
+    return '%%(ENV:INIHERIT_BENCH_%d:-%s)s' % (oidx, name)
+  return '%%(SUPER:-%s)s,%s' % (name, name)
+
+#------------------------------------------------------------------------------
+def _write(path, inherits, body):
+  with open(path, 'w') as fp:
+    fp.write('[DEFAULT]\n')
+    if inherits:
+      fp.write('%inherit = ' + ' '.join(inherits) + '\n')
+    fp.write('name = ' + os.path.basename(path) + '\n')
+    fp.write(body)
+
+#------------------------------------------------------------------------------
+def generate(directory, spec):
+  '''
+  Writes a configuration tree with the shape `spec` (a
+  :class:`TreeSpec`) into `directory` and returns a :class:`Tree`.
+  '''
+  rand  = random.Random(spec.seed)
+  files = []
+  def body(name):
+    lines = []
+    for sidx in range(spec.sections):
+      lines.append('[section%d]' % (sidx,))
+      for oidx in range(spec.options):
+        lines.append('option%d = %s' % (oidx, _value(rand, spec, name, sidx, oidx)))
+    return '\n'.join(lines) + '\n'
+  bases = []
+  for idx in range(spec.diamonds):
+    name = 'base%d.ini' % (idx,)
+    _write(os.path.join(directory, name), [], body(name))
+    bases.append(name)
+    files.append(name)
+  def node(path, level):
+    if level >= spec.depth:
+      inherits = list(bases)
+    else:
+      inherits = []
+      for idx in range(spec.fanout):
+        child = '%s-%d' % (path, idx)
+        node(child, level + 1)
+        inherits.append(child + '.ini')
+    name = path + '.ini'
+    _write(os.path.join(directory, name), inherits, body(name))
+    files.append(name)
+  node('node', 0)
+  hotkeys = [
+    ('section%d' % (rand.randrange(spec.sections),),
+     'option%d' % (rand.randrange(spec.options),))
+    for idx in range(min(20, spec.sections * spec.options))]
+  return Tree(
+    os.path.join(directory, 'node.ini'),
+    [os.path.join(directory, name) for name in files],
+    hotkeys)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+#------------------------------------------------------------------------------
@@ -9,6 +9,10 @@
 from .parser import *
 from . import mixin
 from .interpolation import InterpolationMissingEnvError, InterpolationMissingSuperError
+from .snapshot import Snapshot, compile_snapshot, load_snapshot
+from .frozen import FrozenConfig, freeze
+from .shared import SharedConfig
+from .diskcache import DiskCache
 
 #------------------------------------------------------------------------------
 # end of $Id$
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+# note: this module requires Python 3.5+ and is therefore not imported
+#       by the `iniherit` package itself.
+
+import io
+import asyncio
+
+from .parser import Loader, _filestat, _closing
+
+__all__ = ('AsyncLoader', 'aread')
+
+# note: `get_running_loop` is Python 3.7+; before that, `get_event_loop`
+#       returns the running loop when called from a coroutine.
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+#------------------------------------------------------------------------------
+class AsyncLoader(object):
+  '''
+  The asynchronous counterpart of :class:`iniherit.Loader`: the
+  coroutine :meth:`load` must return a readable, file-like object for
+  the INI file `name`, or raise an ``IOError`` if it does not exist.
+
+  This default implementation runs the synchronous `loader` (which
+  defaults to :class:`iniherit.Loader`) in the event loop's default
+  executor, and returns the file's content buffered in memory.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, loader=None):
+    self.loader = loader or Loader()
+
+  #----------------------------------------------------------------------------
+  async def load(self, name, encoding=None):
+    return await _running_loop().run_in_executor(
+      None, self._load, name, encoding)
+
+  #----------------------------------------------------------------------------
+  def _load(self, name, encoding):
+    with _closing(self.loader.load(name, encoding=encoding)) as fp:
+      ret = io.StringIO(fp.read())
+    ret.name = name
+    return ret
+
+
+#------------------------------------------------------------------------------
+async def _fetch(parser, loader, name, encoding):
+  # the asynchronous version of `IniheritMixin._im_loadFile`
+  loop = _running_loop()
+  stat = await loop.run_in_executor(None, _filestat, name)
+  try:
+    fp = await loader.load(name, encoding=encoding)
+  except IOError as err:
+    return err
+  try:
+    with _closing(fp) as fp:
+      return parser._im_parse(fp, name) + (stat,)
+  except Exception as err:
+    return err
+
+#------------------------------------------------------------------------------
+async def aread(parser, filenames, encoding=None, loader=None):
+  '''
+  Implements :meth:`iniherit.IniheritMixin.aread`: the inheritance
+  graph is discovered level by level (i.e. breadth-first), fetching
+  all files of a level concurrently. Once all files are parsed, they
+  are merged in the same order as :meth:`read` would.
+  '''
+  if isinstance(filenames, str):
+    filenames = [filenames]
+  if not parser._im_inheriting():
+    return parser.read(filenames, encoding=encoding)
+  if loader is None:
+    loader = AsyncLoader(getattr(parser, 'loader', None))
+  cache  = parser._im_filecache()
+  parsed = dict()
+  # note: files with a current `DiskCache` entry are neither fetched
+  #       nor is their inheritance graph; the loaded entries (and
+  #       misses) are handed to `_im_read` so it doesn't load them again.
+  resolved = dict()
+  if parser._im_diskcache() is not None:
+    for name in filenames:
+      resolved[name] = parser._im_diskcached(name, encoding)
+  level  = [name for name in filenames if resolved.get(name) is None]
+  while level:
+    fetch = dict()
+    for name in level:
+      key = parser._im_cachekey(name, encoding)
+      if key in parsed or key in fetch \
+          or ( cache is not None and cache.get(key) is not None ):
+        continue
+      fetch[key] = name
+    results = await asyncio.gather(*[
+      _fetch(parser, loader, name, encoding) for name in fetch.values()])
+    level = []
+    for key, item in zip(fetch.keys(), results):
+      parsed[key] = item
+      if isinstance(item, tuple):
+        level.extend(inherit[2] for inherit in item[1])
+  ret = parser._im_read(
+    filenames, encoding=encoding, parsed=parsed, resolved=resolved)
+  parser._im_recordRead(filenames, encoding)
+  return ret
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -6,10 +6,11 @@
 # copy: (C) Copyright 2013 Cadit Health Inc., All Rights Reserved.
 #------------------------------------------------------------------------------
 
-import sys, os, logging, time, argparse, gettext
+import sys, os, logging, argparse, gettext, hashlib, functools
 import six
 
-import iniherit, iniherit.parser
+import iniherit, iniherit.snapshot, iniherit.watch, iniherit.writer
+import iniherit.instrument
 
 log = logging.getLogger(__name__)
 
@@ -39,21 +40,187 @@ class WatchingLoader(iniherit.Loader):
     return iniherit.Loader.load(self, name, encoding)
 
 #------------------------------------------------------------------------------
-def flatten(input, output, loader=None):
-  cfg = iniherit.RawConfigParser(loader=loader)
-  cfg.optionxform = str
-  if isstr(input):
-    cfg.read(input)
-  else:
-    cfg.readfp(input)
-  out = iniherit.parser.CP.RawConfigParser()
-  out.optionxform = str
-  cfg._apply(cfg, out)
-  if not isstr(output):
-    out.write(output)
-  else:
-    with open(output, 'wb') as fp:
-      out.write(fp)
+def _encode(chunk):
+  if isinstance(chunk, six.text_type):
+    return chunk.encode('utf-8')
+  return chunk
+
+#------------------------------------------------------------------------------
+def _outputhash(filename):
+  try:
+    return iniherit.snapshot._filehash(filename)
+  except (OSError, IOError):
+    return None
+
+#------------------------------------------------------------------------------
+class Flattener(object):
+  '''
+  Flattens `input` into `output`, and keeps the parsed and resolved
+  files in memory so that subsequent calls to :meth:`flatten` only
+  re-parse the files that were reported as changed and only re-merge
+  the files that (directly or indirectly) inherit them. An output file
+  is only written if its content would change.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, input, output, loader=None, filecache=None,
+               format='ini', explain=False, hook=None):
+    self.input  = input
+    self.output = output
+    self.loader = loader
+    self.filecache = filecache
+    self.format = format
+    self.explain = explain
+    self.hook   = hook
+    self.parsed = dict()
+    self.memo   = dict()
+    self.files  = set()
+    self.digest = None
+
+  #----------------------------------------------------------------------------
+  def invalidate(self, changed):
+    '''
+    Drops the cached state of all files in `changed` and of all
+    resolved files that depend on them.
+    '''
+    changed = set(os.path.abspath(name) for name in changed)
+    for key in list(self.parsed):
+      if key[0] in changed:
+        del self.parsed[key]
+    for key, raw in list(self.memo.items()):
+      if not raw._im_cacheable or changed.intersection(raw._im_files):
+        del self.memo[key]
+
+  #----------------------------------------------------------------------------
+  def flatten(self, changed=None):
+    '''
+    Flattens the input, after invalidating the files in `changed` (if
+    specified), and returns ``True`` if the output was written.
+    '''
+    if changed:
+      self.invalidate(changed)
+    cfg = iniherit.RawConfigParser(
+      loader=self.loader, filecache=self.filecache,
+      track_provenance=self.explain, hook=self.hook)
+    cfg.optionxform = str
+    if isstr(self.input):
+      cfg._im_read(self.input, parsed=self.parsed, memo=self.memo)
+    else:
+      cfg.readfp(self.input)
+    self.files = set(getattr(cfg, '_im_files', None) or ())
+    return cfg._im_timed(
+      'write', getattr(self.output, 'name', self.output), self._write, cfg)
+
+  #----------------------------------------------------------------------------
+  def _write(self, cfg):
+    if not isstr(self.output):
+      iniherit.writer.write(cfg, self.output, self.format, self.explain)
+      return True
+    # note: the output is hashed in a first streaming pass and left
+    #       untouched if its content would not change, so that
+    #       downstream watchers are not woken up.
+    hasher = hashlib.sha1()
+    for chunk in iniherit.writer.generate(cfg, self.format, self.explain):
+      hasher.update(_encode(chunk))
+    digest = hasher.hexdigest()
+    if self.digest is None:
+      self.digest = _outputhash(self.output)
+    if digest == self.digest:
+      return False
+    with open(self.output, 'wb') as fp:
+      for chunk in iniherit.writer.generate(cfg, self.format, self.explain):
+        fp.write(_encode(chunk))
+    self.digest = digest
+    return True
+
+#------------------------------------------------------------------------------
+def flatten(input, output, loader=None, format='ini', explain=False):
+  Flattener(input, output, loader, format=format, explain=explain).flatten()
+
+#------------------------------------------------------------------------------
+def parseTarget(spec, basedir=None):
+  '''
+  Parses a batch target `spec` of the form ``INPUT:OUTPUT`` (the last
+  colon is the separator) into an ``(input, output)`` tuple. Relative
+  paths are taken relative to `basedir`, if specified.
+  '''
+  input, sep, output = spec.rpartition(':')
+  if not sep or not input or not output:
+    raise ValueError(_('invalid batch target "{}" (expected "INPUT:OUTPUT")', spec))
+  if basedir:
+    input  = os.path.join(basedir, input)
+    output = os.path.join(basedir, output)
+  return (input, output)
+
+#------------------------------------------------------------------------------
+def readManifest(filename):
+  '''
+  Reads the batch targets from the manifest file `filename`, which
+  contains one target per line, either as ``INPUT OUTPUT`` or as
+  ``INPUT:OUTPUT``. Blank lines and lines starting with "#" are
+  ignored, and relative paths are taken relative to the manifest.
+  '''
+  basedir = os.path.dirname(filename)
+  ret = []
+  with open(filename) as fp:
+    for line in fp:
+      line = line.strip()
+      if not line or line.startswith('#'):
+        continue
+      words = line.split()
+      if len(words) == 2:
+        ret.append(parseTarget(':'.join(words), basedir))
+      else:
+        ret.append(parseTarget(line, basedir))
+  return ret
+
+#------------------------------------------------------------------------------
+_batchcache = None
+
+def _flattenTarget(target, format='ini', explain=False):
+  # note: each pool worker process keeps its own `FileCache`, so
+  #       shared base files are only parsed once per worker.
+  global _batchcache
+  if _batchcache is None:
+    _batchcache = iniherit.FileCache()
+  log.debug(_('flattening "%s" to "%s"'), target[0], target[1])
+  return Flattener(
+    target[0], target[1], filecache=_batchcache, format=format,
+    explain=explain).flatten()
+
+#------------------------------------------------------------------------------
+def flattenBatch(targets, jobs=None, filecache=None, format='ini', explain=False):
+  '''
+  Flattens all ``(input, output)`` pairs in `targets` in a single
+  process, sharing one :class:`iniherit.FileCache` (or `filecache`)
+  so that common inherited files are only parsed once. If `jobs` is
+  greater than one, the targets are spread over a pool of that many
+  worker processes instead. Returns the number of outputs written.
+  '''
+  targets = list(targets)
+  if not jobs or jobs <= 1 or len(targets) <= 1:
+    if filecache is None:
+      filecache = iniherit.FileCache()
+    return len([
+      target for target in targets
+      if Flattener(
+          target[0], target[1], filecache=filecache, format=format,
+          explain=explain).flatten()])
+  import multiprocessing
+  pool = multiprocessing.Pool(jobs)
+  try:
+    # note: contiguous chunks keep related targets (which typically
+    #       share base files) on the same worker.
+    chunksize = max(1, len(targets) // ( jobs * 4 ))
+    return len([
+      written
+      for written in pool.map(
+        functools.partial(_flattenTarget, format=format, explain=explain),
+        targets, chunksize)
+      if written])
+  finally:
+    pool.close()
+    pool.join()
 
 #------------------------------------------------------------------------------
 def getFilestats(files):
@@ -71,32 +238,55 @@ def getFilestats(files):
     ret[filename] = mtime
   return ret
 
+#------------------------------------------------------------------------------
+def getFileSignatures(files):
+  '''
+  Returns a dict mapping each filename in `files` to its ``(mtime_ns,
+  size, inode)`` signature, or ``None`` if it cannot be `stat`'ed. See
+  :class:`iniherit.watch.ChangeDetector` for content-aware change
+  detection.
+  '''
+  return dict((filename, iniherit.watch.signature(filename)) for filename in files)
+
 #------------------------------------------------------------------------------
 def run(options):
+  if options.targets:
+    count = flattenBatch(
+      options.targets, jobs=options.jobs, format=options.format,
+      explain=options.explain)
+    log.info(_('%d of %d outputs updated'), count, len(options.targets))
+    return 0
+  watcher = None
   try:
+    collector = iniherit.instrument.Collector() if options.profile else None
+    flattener = Flattener(
+      options.input, options.output, WatchingLoader(options),
+      format=options.format, explain=options.explain, hook=collector)
+    changed = None
     while True:
-      loader = WatchingLoader(options)
-      flatten(options.input, options.output, loader)
+      if not flattener.flatten(changed) and changed:
+        log.info(_('output unchanged'))
+      if collector is not None:
+        sys.stderr.write(collector.summary() + '\n')
+        flattener.hook = collector = iniherit.instrument.Collector()
       if not options.watch:
         return 0
-      filestats = getFilestats(loader.files)
-      changed = set()
-      while True:
-        time.sleep(options.interval)
-        log.debug(_('checking for changes...'))
-        newstats = getFilestats(loader.files)
-        for k, v in filestats.items():
-          if newstats.get(k) != v:
-            changed.add(k)
-        if len(changed) > 0:
-          break
+      if watcher is None:
+        watcher = iniherit.watch.getWatcher(
+          options.backend, options.interval, options.debounce)
+      # note: the watched set is refreshed after every flatten so
+      #       that added or removed `%inherit` targets are tracked.
+      watcher.update(flattener.files or flattener.loader.files)
+      changed = watcher.wait()
       if len(changed) == 1:
         log.info(_('"%s" changed; updating output...'), list(changed)[0])
       else:
         log.info(_('%d files changed; updating output...'), len(changed))
-      continue
   except KeyboardInterrupt:
     return 0
+  finally:
+    if watcher is not None:
+      watcher.close()
 
 #------------------------------------------------------------------------------
 def main(argv=None):
@@ -127,7 +317,24 @@ def main(argv=None):
     dest='interval', type=float, default=2.0,
     help=_('number of seconds (with decimal precision)'
            ' to wait between checks for changes (only useful when'
-           ' used with "--watch") [defaults to %(default)s]'))
+           ' used with "--watch" and the "poll" backend)'
+           ' [defaults to %(default)s]'))
+
+  cli.add_argument(
+    _('--watch-backend'),
+    dest='backend', choices=('auto', 'inotify', 'poll'), default='auto',
+    help=_('set the change detection mechanism: "inotify" uses Linux'
+           ' inotify events, "poll" periodically checks all files,'
+           ' and "auto" uses inotify if available and otherwise polls'
+           ' [defaults to %(default)s]'))
+
+  cli.add_argument(
+    _('--watch-debounce'),
+    dest='debounce', type=float, default=0.1,
+    help=_('number of seconds to wait for further changes after a'
+           ' change is detected before updating the output, so that'
+           ' multi-file edits result in a single update'
+           ' [defaults to %(default)s]'))
 
   cli.add_argument(
     metavar=_('INPUT'),
@@ -142,8 +349,61 @@ def main(argv=None):
     help=_('set output filename; if unspecified or "-", writes output'
            ' to STDOUT.'))
 
+  cli.add_argument(
+    _('-f'), _('--format'),
+    dest='format', choices=sorted(iniherit.writer.FORMATS), default='ini',
+    help=_('set the output format [defaults to %(default)s]'))
+
+  cli.add_argument(
+    _('-e'), _('--explain'),
+    dest='explain', action='store_true', default=False,
+    help=_('precede each option in the output with comments listing'
+           ' the file, line and raw value of each definition that'
+           ' contributed to it (only supported by the "ini" format)'))
+
+  cli.add_argument(
+    _('-p'), _('--profile'),
+    dest='profile', action='store_true', default=False,
+    help=_('print a summary of the time spent loading, parsing,'
+           ' merging, interpolating and writing to STDERR after'
+           ' each flatten'))
+
+  cli.add_argument(
+    _('-b'), _('--batch'),
+    dest='batch', metavar=_('INPUT:OUTPUT'), action='append', default=[],
+    help=_('flatten INPUT into OUTPUT as part of a batch (can be'
+           ' specified multiple times); all batch targets are'
+           ' flattened in a single process and share parsed files'))
+
+  cli.add_argument(
+    _('-m'), _('--manifest'),
+    dest='manifest', metavar=_('FILENAME'), action='append', default=[],
+    help=_('add the batch targets listed in FILENAME, one "INPUT'
+           ' OUTPUT" pair per line (relative to FILENAME)'))
+
+  cli.add_argument(
+    _('-j'), _('--jobs'),
+    dest='jobs', metavar=_('N'), type=int, default=1,
+    help=_('spread batch targets over N worker processes'
+           ' [defaults to %(default)s]'))
+
   options = cli.parse_args(argv)
 
+  try:
+    options.targets = [parseTarget(spec) for spec in options.batch]
+    for manifest in options.manifest:
+      options.targets.extend(readManifest(manifest))
+  except (ValueError, IOError, OSError) as err:
+    cli.error(str(err))
+
+  if options.explain and options.format != 'ini':
+    cli.error(_('"--explain" is only supported by the "ini" format'))
+
+  if options.targets and (
+      options.watch or options.input is not sys.stdin
+      or options.output is not sys.stdout):
+    cli.error(_('batch targets cannot be combined with INPUT, OUTPUT or "--watch"'))
+
   if options.input == '-':
     options.input = sys.stdin
 
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+A persistent, cross-process cache of resolved INI files, used by
+parsers created with the `diskcache` parameter (see
+:class:`DiskCache`).
+'''
+
+import os
+import sys
+import time
+import errno
+import marshal
+import hashlib
+
+from .parser import _filestat, _rawitems
+from .snapshot import _atomic_write, _ident
+
+__all__ = ('DiskCache',)
+
+#------------------------------------------------------------------------------
+
+DISKCACHE_VERSION = 1
+
+#------------------------------------------------------------------------------
+def _cachedir():
+  base = os.environ.get('XDG_CACHE_HOME') \
+    or os.path.join(os.path.expanduser('~'), '.cache')
+  return os.path.join(base, 'iniherit')
+
+#------------------------------------------------------------------------------
+class DiskCache(object):
+  '''
+  A cache of fully-resolved ("flattened") INI files that is stored in
+  the directory `directory` (which defaults to
+  ``$XDG_CACHE_HOME/iniherit``) and is therefore shared between
+  processes, e.g. short-lived command-line tools::
+
+    cfg = iniherit.SafeConfigParser(diskcache=True)
+    cfg.read('config.ini')
+
+  Each file that is passed to `read` has its own entry, which stores
+  the raw (i.e. un-interpolated) values in `marshal` format together
+  with the path, modification time and size of every file that
+  contributed to it. If all of them are unchanged, `read` loads the
+  entry instead of parsing and resolving any file; otherwise the files
+  are resolved as usual and the entry is re-written. Entries are
+  written atomically, so concurrent readers and writers are safe.
+
+  Files that were modified less than `racy` seconds before an entry
+  would be written are not cached (since a subsequent change could go
+  unnoticed on file systems with coarse timestamps), nor are files
+  that cannot be cached by a :class:`iniherit.FileCache`. Parsers
+  with provenance tracking or a `lambda` optionxform bypass the cache.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, directory=None, racy=2.0):
+    self.directory = directory or _cachedir()
+    self.racy      = racy
+
+  #----------------------------------------------------------------------------
+  def path(self, parser, name, encoding=None):
+    '''
+    Returns the path of the cache entry of the file `name` as read by
+    `parser`, or ``None`` if it cannot be cached.
+    '''
+    if getattr(parser, 'track_provenance', False):
+      return None
+    # note: the lazy and provenance flags of the key are dropped, since
+    #       entries store the flattened values.
+    key = [_ident(item) for item in parser._im_cachekey(name, encoding)[:6]]
+    if None in key[2:4]:
+      return None
+    key = repr((DISKCACHE_VERSION, tuple(sys.version_info[:2]), key))
+    return os.path.join(
+      self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+  #----------------------------------------------------------------------------
+  def load(self, parser, name, encoding=None):
+    '''
+    Returns a tuple of ``(files, defaults, sections)`` for the cached
+    file `name` as read by `parser`, where `files` is a list of
+    ``(path, stat)`` pairs, `defaults` a list of raw ``(option,
+    value)`` pairs and `sections` a list of ``(section, items)``
+    pairs. Returns ``None`` if there is no current entry.
+    '''
+    path = self.path(parser, name, encoding)
+    if path is None:
+      return None
+    try:
+      with open(path, 'rb') as fp:
+        data = marshal.loads(fp.read())
+      version, files, defaults, sections = data
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+      return None
+    if version != DISKCACHE_VERSION:
+      return None
+    files = [
+      (filename, tuple(stat) if stat is not None else None)
+      for filename, stat in files]
+    for filename, stat in files:
+      if _filestat(filename) != stat:
+        return None
+    return (files, defaults, sections)
+
+  #----------------------------------------------------------------------------
+  def store(self, parser, name, encoding, raw):
+    '''
+    Stores the resolved file `raw` (as returned by
+    :meth:`iniherit.IniheritMixin._im_readFile`) as the entry for the
+    file `name` as read by `parser`. Returns whether or not it was
+    stored.
+    '''
+    if not getattr(raw, '_im_cacheable', False):
+      return False
+    path = self.path(parser, name, encoding)
+    if path is None:
+      return False
+    limit = int((time.time() - self.racy) * 1000000000)
+    files = list(raw._im_files.items())
+    for filename, stat in files:
+      if stat is not None and stat[0] > limit:
+        return False
+    rawitems = getattr(raw, 'rawitems', None)
+    if rawitems is None:
+      rawitems = lambda section: _rawitems(raw, section)
+    data = marshal.dumps((
+      DISKCACHE_VERSION,
+      [(filename, stat) for filename, stat in files],
+      rawitems(parser.IM_DEFAULTSECT),
+      [(section, rawitems(section)) for section in raw.sections()],
+    ))
+    try:
+      try:
+        os.makedirs(self.directory)
+      except OSError as err:
+        if err.errno != errno.EEXIST:
+          raise
+      _atomic_write(path, data)
+    except (IOError, OSError):
+      return False
+    return True
+
+  #----------------------------------------------------------------------------
+  def clear(self):
+    'Removes all entries from the cache directory.'
+    try:
+      names = os.listdir(self.directory)
+    except OSError:
+      return
+    for name in names:
+      try:
+        os.unlink(os.path.join(self.directory, name))
+      except OSError:
+        pass
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
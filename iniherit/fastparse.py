@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+A fast INI parser backend, used by parsers created with
+``fastparse=True``. It classifies all lines of a file with a single
+compiled regular expression scan over the whole text, and reproduces
+the section and option structure (including continuation lines,
+comments and blank lines within values) of the stdlib parser with the
+default settings, following the rules of the running Python version
+(e.g. Python 2's column-0 comments, "rem" lines, inline ";" comments
+and ``__name__`` entries vs. Python 3's strict duplicate checking).
+
+Anything that the stdlib parser would report as an error, or that is
+unusual enough not to be worth optimizing, makes :func:`scan` return
+``None``, in which case the caller falls back to the stdlib parser.
+'''
+
+import re
+from collections import OrderedDict
+
+import six
+from six.moves import configparser as CP
+
+__all__ = ('scan', 'parse')
+
+#------------------------------------------------------------------------------
+# note: `[^\S\n]` is "whitespace, except newlines", so that a match
+#       never spans multiple lines.
+_line_cre = re.compile(r'''
+  ^(?P<indent>[^\S\n]*)
+  (?P<content>
+      (?P<option>[^\s=:\[\#;][^=:\n]*?)[^\S\n]*[=:][^\S\n]*(?P<value>[^\n]*?)
+    | [^\n]*?
+  )
+  [^\S\n]*$
+''', re.MULTILINE | re.VERBOSE)
+
+#------------------------------------------------------------------------------
+def _scan3(text, optionxform, defaultsect, sectcre):
+  defaults = OrderedDict()
+  sections = OrderedDict()
+  added    = set()
+  cursect  = None
+  sectname = None
+  optname  = None
+  level    = 0
+  for match in _line_cre.finditer(text):
+    content = match.group('content')
+    if not content:
+      if cursect is not None and optname:
+        cursect[optname].append('')
+      continue
+    if content[0] in '#;':
+      continue
+    indent = match.end('indent') - match.start()
+    if cursect is not None and optname and indent > level:
+      cursect[optname].append(content)
+      continue
+    level = indent
+    if content[0] == '[':
+      header = sectcre.match(content)
+      if header:
+        sectname = header.group('header')
+        if sectname == defaultsect:
+          cursect = defaults
+        elif sectname in sections:
+          return None
+        else:
+          cursect = sections[sectname] = OrderedDict()
+        optname = None
+        continue
+    option = match.group('option')
+    if cursect is None or option is None:
+      return None
+    optname = optionxform(option)
+    if (sectname, optname) in added:
+      return None
+    added.add((sectname, optname))
+    cursect[optname] = [match.group('value')]
+  for options in [defaults] + list(sections.values()):
+    for name, lines in options.items():
+      options[name] = '\n'.join(lines).rstrip()
+  return (defaults, sections)
+
+#------------------------------------------------------------------------------
+def _scan2(text, optionxform, defaultsect, sectcre):
+  defaults = OrderedDict()
+  sections = OrderedDict()
+  cursect  = None
+  optname  = None
+  for match in _line_cre.finditer(text):
+    content = match.group('content')
+    if not content:
+      continue
+    indent = match.end('indent') > match.start()
+    if not indent:
+      if content[0] in '#;':
+        continue
+      if content[0] in 'rR' and content.split(None, 1)[0].lower() == 'rem':
+        continue
+    if indent:
+      if cursect is None or not optname:
+        return None
+      cursect[optname].append(content)
+      continue
+    if content[0] == '[':
+      header = sectcre.match(content)
+      if header:
+        sectname = header.group('header')
+        if sectname in sections:
+          cursect = sections[sectname]
+        elif sectname == defaultsect:
+          cursect = defaults
+        else:
+          cursect = sections[sectname] = OrderedDict()
+          cursect['__name__'] = sectname
+        optname = None
+        continue
+    option = match.group('option')
+    if cursect is None or option is None:
+      return None
+    optname = optionxform(option)
+    value = match.group('value')
+    pos = value.find(';')
+    if pos == 0:
+      # PY2 checks the character *before* the value (i.e. the last
+      # one, including trailing whitespace)
+      return None
+    if pos > 0 and value[pos - 1].isspace():
+      value = value[:pos].strip()
+    if value == '""':
+      value = ''
+    cursect[optname] = [value]
+  for options in [defaults] + list(sections.values()):
+    for name, lines in options.items():
+      if isinstance(lines, list):
+        options[name] = '\n'.join(lines)
+  return (defaults, sections)
+
+#------------------------------------------------------------------------------
+def scan(text, optionxform=None, defaultsect=CP.DEFAULTSECT, py2=six.PY2,
+         sectcre=None):
+  '''
+  Parses the INI `text` and returns a tuple of ``(defaults,
+  sections)``, where `defaults` is an ordered dict of the DEFAULT
+  options and `sections` an ordered dict mapping section names to
+  ordered dicts of their options, exactly as the stdlib parser would
+  store them (following the Python 2 rules if `py2` is truthy).
+  Section headers are matched with `sectcre`, which defaults to the
+  running stdlib's ``SECTCRE`` (whose handling of "]" within section
+  names differs between Python versions). Returns ``None`` if `text`
+  must be parsed by the stdlib parser.
+  '''
+  optionxform = optionxform or (lambda option: option.lower())
+  sectcre = sectcre or CP.RawConfigParser.SECTCRE
+  if py2:
+    return _scan2(text, optionxform, defaultsect, sectcre)
+  return _scan3(text, optionxform, defaultsect, sectcre)
+
+#------------------------------------------------------------------------------
+def _compatible(parser):
+  # checks that `parser` uses the parsing settings that `scan` emulates
+  if six.PY2:
+    return parser._optcre is parser.OPTCRE
+  return (
+    tuple(parser._delimiters) == ('=', ':')
+    and tuple(parser._comment_prefixes) == ('#', ';')
+    and not parser._inline_comment_prefixes
+    and parser._strict
+    and parser._empty_lines_in_values
+    and not parser._allow_no_value)
+
+#------------------------------------------------------------------------------
+def parse(parser, text):
+  '''
+  Parses `text` into the empty stdlib `parser`, and returns ``True``,
+  or returns ``False`` (leaving `parser` untouched) if `text` must be
+  parsed by the stdlib parser instead.
+  '''
+  if parser._sections or parser._defaults or not _compatible(parser):
+    return False
+  defsect = getattr(parser, 'default_section', CP.DEFAULTSECT)
+  result = scan(text, parser.optionxform, defsect, sectcre=parser.SECTCRE)
+  if result is None:
+    return False
+  defaults, sections = result
+  parser._defaults.update(defaults)
+  proxies = getattr(parser, '_proxies', None)
+  for name, options in sections.items():
+    parser._sections[name] = section = parser._dict()
+    section.update(options)
+    if proxies is not None:
+      proxies[name] = CP.SectionProxy(parser, name)
+  return True
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
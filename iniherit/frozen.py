@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import six
+from six.moves import configparser as CP
+from six.moves import intern
+
+__all__ = ('FrozenConfig', 'freeze')
+
+#------------------------------------------------------------------------------
+
+_UNSET = object()
+
+_BOOLEAN_STATES = \
+  getattr(CP.RawConfigParser, 'BOOLEAN_STATES', None) \
+  or CP.RawConfigParser._boolean_states
+
+#------------------------------------------------------------------------------
+class _Error(object):
+  # wraps an error that occurred while resolving a value; it is
+  # re-raised when the value is requested.
+  __slots__ = ('error',)
+  def __init__(self, error):
+    self.error = error
+  def __reduce__(self):
+    return (_Error, (self.error,))
+
+
+#------------------------------------------------------------------------------
+class FrozenConfig(object):
+  '''
+  An immutable, picklable configuration with all interpolation
+  pre-resolved, as returned by :func:`freeze`. It supports the
+  read-only subset of the `ConfigParser` API (i.e. `sections`,
+  `has_section`, `options`, `has_option`, `get`, `getint`,
+  `getfloat`, `getboolean`, `items` and `defaults`).
+
+  Section and option names are interned, and sections only store
+  the options that they define or whose interpolated value differs
+  from the DEFAULT section. Since the containers are plain dicts of
+  strings, CPython's garbage collector does not track them, which
+  helps keep memory pages shared between forked worker processes.
+  Note that the order of sections and options is only preserved on
+  Python 3.7+.
+
+  Values that could not be interpolated (e.g. due to a missing
+  environment variable) raise the original error when requested.
+
+  Option names are normalized with `optionxform` (``None`` selects the
+  stdlib default, i.e. lower-casing). Note that a `FrozenConfig` is
+  only picklable if its `optionxform` is.
+  '''
+
+  __slots__ = ('_defaults', '_sections', '_xform', '_default_section')
+
+  #----------------------------------------------------------------------------
+  def __init__(self, defaults, sections, optionxform=None,
+               default_section=CP.DEFAULTSECT):
+    object.__setattr__(self, '_defaults', defaults)
+    object.__setattr__(self, '_sections', sections)
+    object.__setattr__(self, '_xform', optionxform)
+    object.__setattr__(self, '_default_section', default_section)
+
+  #----------------------------------------------------------------------------
+  def __setattr__(self, name, value):
+    raise TypeError('%s objects are immutable' % (self.__class__.__name__,))
+  __delattr__ = __setattr__
+
+  #----------------------------------------------------------------------------
+  def __reduce__(self):
+    return (self.__class__, (
+      self._defaults, self._sections, self._xform, self._default_section))
+
+  #----------------------------------------------------------------------------
+  def _section(self, section):
+    if section == self._default_section:
+      return self._defaults
+    try:
+      return self._sections[section]
+    except KeyError:
+      raise CP.NoSectionError(section)
+
+  #----------------------------------------------------------------------------
+  def _option(self, option):
+    if self._xform is None:
+      return option.lower()
+    return self._xform(option)
+
+  #----------------------------------------------------------------------------
+  def sections(self):
+    return list(self._sections.keys())
+
+  #----------------------------------------------------------------------------
+  def has_section(self, section):
+    return section in self._sections
+
+  #----------------------------------------------------------------------------
+  def __contains__(self, section):
+    return section == self._default_section or section in self._sections
+
+  #----------------------------------------------------------------------------
+  def defaults(self):
+    return dict(
+      (key, value) for key, value in self._defaults.items()
+      if not isinstance(value, _Error))
+
+  #----------------------------------------------------------------------------
+  def options(self, section):
+    values = self._section(section)
+    if values is self._defaults:
+      return list(values.keys())
+    return list(self._defaults.keys()) \
+      + [key for key in values.keys() if key not in self._defaults]
+
+  #----------------------------------------------------------------------------
+  def has_option(self, section, option):
+    option = self._option(option)
+    if section == self._default_section or not section:
+      return option in self._defaults
+    values = self._sections.get(section)
+    if values is None:
+      return False
+    return option in values or option in self._defaults
+
+  #----------------------------------------------------------------------------
+  def get(self, section, option, fallback=_UNSET):
+    values = self._section(section)
+    option = self._option(option)
+    value = values.get(option, _UNSET)
+    if value is _UNSET:
+      value = self._defaults.get(option, _UNSET)
+    if value is _UNSET:
+      if fallback is not _UNSET:
+        return fallback
+      raise CP.NoOptionError(option, section)
+    if isinstance(value, _Error):
+      raise value.error
+    return value
+
+  #----------------------------------------------------------------------------
+  def _get(self, conv, section, option, fallback):
+    try:
+      value = self.get(section, option)
+    except (CP.NoSectionError, CP.NoOptionError):
+      if fallback is _UNSET:
+        raise
+      return fallback
+    return conv(value)
+
+  #----------------------------------------------------------------------------
+  def getint(self, section, option, fallback=_UNSET):
+    return self._get(int, section, option, fallback)
+
+  #----------------------------------------------------------------------------
+  def getfloat(self, section, option, fallback=_UNSET):
+    return self._get(float, section, option, fallback)
+
+  #----------------------------------------------------------------------------
+  def getboolean(self, section, option, fallback=_UNSET):
+    def conv(value):
+      if value.lower() not in _BOOLEAN_STATES:
+        raise ValueError('Not a boolean: %s' % (value,))
+      return _BOOLEAN_STATES[value.lower()]
+    return self._get(conv, section, option, fallback)
+
+  #----------------------------------------------------------------------------
+  def items(self, section):
+    return [(option, self.get(section, option)) for option in self.options(section)]
+
+
+#------------------------------------------------------------------------------
+def _resolve(parser, section, option):
+  try:
+    return parser.get(section, option)
+  except CP.Error as err:
+    return _Error(err)
+
+#------------------------------------------------------------------------------
+def _optionxform(parser):
+  # returns the `FrozenConfig` optionxform equivalent of `parser`'s.
+  # note: a bound `optionxform` is re-bound to a new stdlib parser (as
+  #       for `IniheritMixin._makeParser`) so that the frozen config
+  #       does not keep `parser` alive.
+  xform = parser.optionxform
+  func = getattr(xform, '__func__', xform)
+  if func is six.get_unbound_function(CP.RawConfigParser.optionxform):
+    return None
+  if getattr(xform, '__self__', None) is parser:
+    xform = six.create_bound_method(func, CP.RawConfigParser())
+  return xform
+
+#------------------------------------------------------------------------------
+def freeze(parser):
+  '''
+  Returns a :class:`FrozenConfig` with all values of `parser`
+  pre-resolved (i.e. interpolated).
+  '''
+  defsect = getattr(parser, 'default_section', CP.DEFAULTSECT)
+  defaults = dict()
+  for option in parser.defaults().keys():
+    defaults[intern(option)] = _resolve(parser, defsect, option)
+  sections = dict()
+  for section in parser.sections():
+    values = dict()
+    for option in parser.options(section):
+      value = _resolve(parser, section, option)
+      if option in defaults \
+          and option not in parser._sections[section] \
+          and not isinstance(value, _Error) \
+          and value == defaults[option]:
+        continue
+      values[intern(option)] = value
+    sections[intern(section)] = values
+  return FrozenConfig(
+    defaults, sections, optionxform=_optionxform(parser),
+    default_section=defsect)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Timing instrumentation for inheritance resolution. A parser created
+with a `hook` parameter calls it as ``hook(event, name, duration,
+**info)`` for each of the following events (`duration` is in
+seconds):
+
+* ``load``: file `name` was opened and read; `info` has the `size` of
+  the text read.
+* ``parse``: file `name` was parsed; `info` has the number of
+  `sections` and `inherits`.
+* ``merge``: the resolved file `name` was merged into its inheriting
+  file or into the parser; for section-level inheritance, `info` has
+  the target `section`.
+* ``interpolate``: a value in section `name` was interpolated; `info`
+  has the `option`, the number of `references` that were resolved and
+  the `depth` of the reference graph.
+* ``write``: the CLI wrote the output `name`.
+
+Without a hook (the default), none of the events are generated and
+nothing is timed. Note that hooks are called from the loading
+threads when `prefetch_workers` is used, and that sections merged on
+access in lazy mode are not reported.
+'''
+
+import timeit
+import threading
+from collections import OrderedDict
+
+__all__ = ('PHASES', 'timer', 'Collector')
+
+#------------------------------------------------------------------------------
+
+PHASES = ('load', 'parse', 'merge', 'interpolate', 'write')
+
+timer = timeit.default_timer
+
+#------------------------------------------------------------------------------
+class Collector(object):
+  '''
+  A hook that accumulates event counts and durations per phase and
+  per file, e.g.::
+
+    collector = iniherit.instrument.Collector()
+    cfg = iniherit.ConfigParser(hook=collector)
+    cfg.read('config.ini')
+    print(collector.summary())
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self):
+    self.phases = OrderedDict((phase, [0, 0.0]) for phase in PHASES)
+    self.files  = dict()
+    self.lock   = threading.Lock()
+
+  #----------------------------------------------------------------------------
+  def __call__(self, event, name, duration, **info):
+    with self.lock:
+      self._add(event, name, duration)
+
+  #----------------------------------------------------------------------------
+  def _add(self, event, name, duration):
+    phase = self.phases.get(event)
+    if phase is None:
+      phase = self.phases[event] = [0, 0.0]
+    phase[0] += 1
+    phase[1] += duration
+    if event == 'interpolate':
+      return
+    times = self.files.get(name)
+    if times is None:
+      times = self.files[name] = dict()
+    times[event] = times.get(event, 0.0) + duration
+
+  #----------------------------------------------------------------------------
+  def summary(self, limit=10):
+    '''
+    Returns a human-readable summary of the time spent per phase, and
+    of the `limit` files with the most time spent on them.
+    '''
+    lines = ['%-12s %8s %12s' % ('phase', 'count', 'total (ms)')]
+    for phase, (count, total) in self.phases.items():
+      if count:
+        lines.append('%-12s %8d %12.3f' % (phase, count, total * 1000))
+    files = sorted(
+      self.files.items(), key=lambda item: -sum(item[1].values()))
+    if limit is not None:
+      files = files[:limit]
+    if files:
+      columns = [phase for phase in PHASES if phase != 'interpolate']
+      lines.append('')
+      lines.append(
+        ' '.join('%10s' % (phase + ' (ms)',) for phase in columns) + '  file')
+      for name, times in files:
+        lines.append(
+          ' '.join('%10.3f' % (times.get(phase, 0.0) * 1000,) for phase in columns)
+          + '  ' + str(name))
+    return '\n'.join(lines)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -12,6 +12,8 @@ import os
 import six
 from six.moves import configparser as CP
 
+from .instrument import timer as _timer
+
 #------------------------------------------------------------------------------
 
 if six.PY3:
@@ -41,75 +43,183 @@ class IniheritInterpolation(BasicInterpolationMixin, _real_BasicInterpolation):
 
 
 #------------------------------------------------------------------------------
-_env_cre = re.compile(r'%\(ENV:([^:)]+)(:-([^)]*))?\)s', flags=re.DOTALL)
-_super_cre = re.compile(r'%\(SUPER(:-([^)]*))?\)s', flags=re.DOTALL)
+# token types generated by `tokenize()`; each token is a tuple of
+# ``(type, text, name, default)``, where `text` is the original text
+# of the token.
+TOKEN_LITERAL   = 'literal'
+TOKEN_ENV       = 'env'
+TOKEN_SUPER     = 'super'
+TOKEN_REFERENCE = 'reference'
+
+# note: "%%" is matched (and then skipped by `tokenize`) so that
+#       escaped text such as "%%(name)s" never yields a token.
+_token_cre = re.compile(
+  r'%%'
+  r'|%\((?:'
+  r'ENV:(?P<env>[^:)]+)(?::-(?P<envdef>[^)]*))?'
+  r'|SUPER(?::-(?P<superdef>[^)]*))?'
+  r'|(?P<ref>[^%)]+)'
+  r')\)s',
+  flags=re.DOTALL)
+
+_tokens_cache     = dict()
+_TOKENS_CACHE_MAX = 4096
+
+#------------------------------------------------------------------------------
+def tokenize(value):
+  '''
+  Splits `value` into a tuple of literal, ENV, SUPER and plain
+  reference (i.e. ``%(name)s``) tokens. Results are cached per raw
+  `value`.
+  '''
+  ret = _tokens_cache.get(value)
+  if ret is not None:
+    return ret
+  tokens = []
+  pos = 0
+  for match in _token_cre.finditer(value):
+    if match.group(0) == '%%':
+      continue
+    if match.start() > pos:
+      tokens.append((TOKEN_LITERAL, value[pos:match.start()], None, None))
+    if match.group('env') is not None:
+      tokens.append(
+        (TOKEN_ENV, match.group(0), match.group('env'), match.group('envdef')))
+    elif match.group('ref') is not None:
+      tokens.append(
+        (TOKEN_REFERENCE, match.group(0), match.group('ref'), None))
+    else:
+      tokens.append(
+        (TOKEN_SUPER, match.group(0), 'SUPER', match.group('superdef')))
+    pos = match.end()
+  if pos < len(value):
+    tokens.append((TOKEN_LITERAL, value[pos:], None, None))
+  ret = tuple(tokens)
+  if len(_tokens_cache) >= _TOKENS_CACHE_MAX:
+    _tokens_cache.clear()
+  _tokens_cache[value] = ret
+  return ret
+
+#------------------------------------------------------------------------------
+def _expand(value, section, option, rawval, depth):
+  # expands all ENV & SUPER tokens in `value`, and then re-expands the
+  # result until it no longer changes, up to `depth` passes. note that
+  # the re-expansion is what resolves nested defaults such as
+  # "%(ENV:A:-%(ENV:B)s)s": the first pass matches up to the first
+  # closing parenthesis and substitutes the default "%(ENV:B", which
+  # forms a new token together with the remaining ")s".
+  while True:
+    tokens = tokenize(value)
+    for token in tokens:
+      if token[0] is TOKEN_ENV or token[0] is TOKEN_SUPER:
+        break
+    else:
+      return value
+    if depth <= 0:
+      raise CP.InterpolationDepthError(option, section, rawval)
+    depth -= 1
+    parts = []
+    for token in tokens:
+      if token[0] is TOKEN_ENV:
+        if token[2] in os.environ:
+          parts.append(os.environ[token[2]])
+        elif token[3] is not None:
+          parts.append(token[3])
+        else:
+          raise InterpolationMissingEnvError(option, section, rawval, token[2])
+      elif token[0] is TOKEN_SUPER:
+        if token[3] is None:
+          raise InterpolationMissingSuperError(option, section, rawval, 'SUPER')
+        parts.append(token[3])
+      else:
+        parts.append(token[1])
+    value = ''.join(parts)
+
+#------------------------------------------------------------------------------
 def interpolate(parser, base_interpolate, section, option, rawval, vars):
   # todo: ugh. this should be rewritten so that it uses
   #       `BasicInterpolationMixin` so as to be more "future-proof"...
-  value = rawval
-  depth = CP.MAX_INTERPOLATION_DEPTH
-  erepl = lambda match: _env_replace(
-    match, parser, base_interpolate, section, option, rawval, vars)
-  srepl = lambda match: _super_replace(
-    match, parser, parser, None, section, option, rawval, vars)
-  while depth and ( _env_cre.search(value) or _super_cre.search(value) ):
-    depth -= 1
-    value = _env_cre.sub(erepl, value)
-    value = _super_cre.sub(srepl, value)
-  if not depth and ( _env_cre.search(value) or _super_cre.search(value) ):
-    raise CP.InterpolationDepthError(option, section, rawval)
-  if '%(SUPER)s' in value:
-    raise InterpolationMissingSuperError(option, section, rawval, 'SUPER')
-  if base_interpolate is None:
-    return value
-  vars = dict(vars)
-  while True:
-    # ok, this is... uh... "tricky"... basically, we don't want to
-    # pre-emptively expand SUPER & ENV expressions because then we may
-    # trip invalid expressions that aren't actually used. thus, we
-    # only expand keys that are actually requested, and we detect by
-    # catching InterpolationMissingOptionError's...
-    try:
-      return base_interpolate(parser, section, option, value, vars)
-    except CP.InterpolationMissingOptionError as err:
-      for key, val in list(vars.items()):
-        if err.reference.lower() in val.lower():
-          newval = interpolate(parser, None, section, key, val, vars)
-          if newval != val:
-            vars[key] = newval
-            break
-      else:
-        raise
+  if '%' not in rawval:
+    return rawval
+  hook = getattr(parser, 'hook', None)
+  if hook is None:
+    return _interpolate(parser, base_interpolate, section, option, rawval, vars, None)
+  stats = dict(references=0, depth=0)
+  start = _timer()
+  try:
+    return _interpolate(
+      parser, base_interpolate, section, option, rawval, vars, stats)
+  finally:
+    hook('interpolate', section, _timer() - start, option=option, **stats)
 
 #------------------------------------------------------------------------------
-def interpolate_super(parser, src, dst, section, option, value):
-  srepl = lambda match: _super_replace(
-    match, parser, src, dst, section, option, value, None)
-  value = _super_cre.sub(srepl, value)
-  return value
+def _interpolate(parser, base_interpolate, section, option, rawval, vars, stats):
+  if '%(' in rawval:
+    value = _expand(rawval, section, option, rawval, CP.MAX_INTERPOLATION_DEPTH)
+  else:
+    value = rawval
+  if base_interpolate is None or '%' not in value:
+    return value
+  # note: SUPER & ENV expressions are not expanded pre-emptively in
+  #       all `vars`, because that may trip invalid expressions that
+  #       aren't actually used. instead, only the values that are
+  #       (transitively) referenced by `value` are expanded.
+  expanded = _resolve_references(
+    parser, section, option, rawval, value, vars, stats)
+  if expanded:
+    vars = dict(vars)
+    vars.update(expanded)
+  return base_interpolate(parser, section, option, value, vars)
 
 #------------------------------------------------------------------------------
-def _env_replace(match, parser, base_interpolate, section, option, rawval, vars):
-  if match.group(1) in os.environ:
-    return os.environ.get(match.group(1))
-  if match.group(2):
-    return match.group(3)
-  raise InterpolationMissingEnvError(option, section, rawval, match.group(1))
+def _resolve_references(parser, section, option, rawval, value, vars, stats=None):
+  # walks the "%(name)s" reference graph of `value` in `vars`
+  # depth-first, expanding SUPER & ENV expressions in each referenced
+  # value exactly once, and returns a dict of the values that changed.
+  # reference cycles are detected explicitly and reported as an
+  # `InterpolationDepthError`, just as the base interpolation would.
+  # if specified, `stats` is updated with the number of `references`
+  # visited and the maximum `depth` of the graph.
+  optionxform = getattr(parser, 'optionxform', None) or (lambda key: key.lower())
+  visited = dict()
+  changed = dict()
+  def visit(value, active):
+    for token in tokenize(value):
+      if token[0] is not TOKEN_REFERENCE:
+        continue
+      key = optionxform(token[2])
+      if key in active:
+        raise CP.InterpolationDepthError(option, section, rawval)
+      if key in visited or key not in vars:
+        continue
+      if stats is not None:
+        stats['depth'] = max(stats['depth'], len(active))
+      raw = vars[key]
+      if raw is None or '%(' not in raw:
+        visited[key] = raw
+        continue
+      val = _expand(raw, section, key, raw, CP.MAX_INTERPOLATION_DEPTH)
+      visited[key] = val
+      if val != raw:
+        changed[key] = val
+      visit(val, active | set([key]))
+  visit(value, frozenset([optionxform(option)]))
+  if stats is not None:
+    stats['references'] = len(visited)
+  return changed
 
 #------------------------------------------------------------------------------
-def _super_replace(match, parser, src, dst, section, option, rawval, vars):
-  if dst \
-     and ( section == parser.IM_DEFAULTSECT or dst.has_section(section) ) \
-     and dst.has_option(section, option):
-    try:
-      return dst.get(section, option, raw=True, vars=vars)
-    except TypeError:
-      return dst.get(section, option)
-  if dst:
-    return match.group(0)
-  if match.group(1):
-    return match.group(2)
-  raise InterpolationMissingSuperError(option, section, rawval, 'SUPER')
+def substitute_super(value, inherited):
+  '''
+  Replaces all "%(SUPER)s" references in `value` with the `inherited`
+  value. If `inherited` is ``None``, the references are left as-is so
+  that they can be resolved by a subsequent merge or at lookup time.
+  '''
+  if inherited is None or '%(SUPER' not in value:
+    return value
+  return ''.join(
+    inherited if token[0] is TOKEN_SUPER else token[1]
+    for token in tokenize(value))
 
 #------------------------------------------------------------------------------
 # end of $Id$
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Support for the ``lazy=True`` parser mode, in which inherited
+sections are only merged when they are first accessed.
+
+In lazy mode, each resolved file is a :class:`LazyResolved`, which
+merges the DEFAULT section eagerly (it is small and needed by every
+lookup), but for every other section only records the list of merge
+operations that contribute to it. Each operation remembers the
+DEFAULT values that were in effect at that point, so that
+``%(SUPER)s`` falls back to the same value as an eager merge would.
+'''
+
+import functools
+import threading
+from collections import OrderedDict
+
+import six
+
+from .parser import CP, _rawitems
+from . import interpolation
+
+try:
+  from collections.abc import MutableMapping
+except ImportError:
+  from collections import MutableMapping
+
+__all__ = ('LazyResolved', 'LazySections')
+
+#------------------------------------------------------------------------------
+def _merge(dst, items, defaults):
+  for option, value in items:
+    inherited = dst.get(option)
+    if inherited is None:
+      inherited = defaults.get(option)
+    dst[option] = interpolation.substitute_super(value, inherited)
+
+#------------------------------------------------------------------------------
+class LazyResolved(object):
+  '''
+  The lazily resolved form of an INI file and its inherited files.
+  The merge operations are added in the same order as an eager merge
+  would apply them (see :meth:`iniherit.IniheritMixin._im_resolve`).
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, defaultsect):
+    self.defaultsect   = defaultsect
+    self.defaults      = OrderedDict()
+    # maps section name => list of (rawitems, fromsect, defaults)
+    self.ops           = OrderedDict()
+    self.resolved      = dict()
+    self._snapshot     = None
+    self._im_files     = OrderedDict()
+    self._im_cacheable = True
+
+  #----------------------------------------------------------------------------
+  def snapshot(self):
+    if self._snapshot is None:
+      self._snapshot = dict(self.defaults)
+    return self._snapshot
+
+  #----------------------------------------------------------------------------
+  def _mergeDefaults(self, items):
+    items = list(items)
+    if items:
+      _merge(self.defaults, items, self.defaults)
+      self._snapshot = None
+
+  #----------------------------------------------------------------------------
+  def addFile(self, sub):
+    'Adds a file-level inheritance of the `LazyResolved` `sub`.'
+    self._mergeDefaults(sub.defaults.items())
+    defaults = self.snapshot()
+    for name in sub.ops:
+      self.ops.setdefault(name, []).append((sub.rawitems, name, defaults))
+
+  #----------------------------------------------------------------------------
+  def addSection(self, sub, fromsect, section):
+    'Adds the inheritance of section `fromsect` of `sub` into `section`.'
+    if fromsect != sub.defaultsect and fromsect not in sub.ops:
+      raise CP.NoSectionError(fromsect)
+    self.ops.setdefault(section, []).append(
+      (sub.rawitems, fromsect, self.snapshot()))
+
+  #----------------------------------------------------------------------------
+  def addSource(self, src):
+    'Adds the content of the (non-inheriting) parser `src`.'
+    self._mergeDefaults(_rawitems(src, self.defaultsect))
+    rawitems = functools.partial(_rawitems, src)
+    defaults = self.snapshot()
+    for name in src.sections():
+      self.ops.setdefault(name, []).append((rawitems, name, defaults))
+
+  #----------------------------------------------------------------------------
+  def addResolved(self, src):
+    '''
+    Adds the content of the parser `src`, which holds already resolved
+    (i.e. flattened) raw values, as-is, i.e. without substituting any
+    "%(SUPER)s" references.
+    '''
+    self.defaults.update(_rawitems(src, self.defaultsect))
+    self._snapshot = None
+    rawitems = functools.partial(_rawitems, src)
+    for name in src.sections():
+      self.ops.setdefault(name, []).append((rawitems, name, dict()))
+
+  #----------------------------------------------------------------------------
+  def sections(self):
+    return list(self.ops)
+
+  #----------------------------------------------------------------------------
+  def section(self, name):
+    '''
+    Returns the resolved raw options of section `name` (excluding
+    DEFAULT values), merging it on first access.
+    '''
+    ret = self.resolved.get(name)
+    if ret is None:
+      try:
+        ops = self.ops[name]
+      except KeyError:
+        raise CP.NoSectionError(name)
+      ret = OrderedDict()
+      for rawitems, fromsect, defaults in ops:
+        _merge(ret, rawitems(fromsect), defaults)
+      self.resolved[name] = ret
+    return ret
+
+  #----------------------------------------------------------------------------
+  def rawitems(self, name):
+    if name == self.defaultsect:
+      return list(self.defaults.items())
+    return list(self.section(name).items())
+
+#------------------------------------------------------------------------------
+class LazySections(MutableMapping):
+  '''
+  A replacement for a parser's ``_sections`` storage that merges
+  pending :class:`LazyResolved` sections into the parser on first
+  access. Section membership and ordering are known without any
+  merging, so e.g. `has_section` and `sections` never trigger one.
+
+  Merges are serialized by a lock, and a section only stops being
+  pending once it is fully merged, so that concurrent readers never
+  see a partially merged section.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, parser, sections):
+    self.parser  = parser
+    self.data    = sections
+    self.names   = OrderedDict((name, True) for name in sections)
+    self.pending = dict()
+    self.lock    = threading.Lock()
+
+  #----------------------------------------------------------------------------
+  def add(self, raw, defaults):
+    '''
+    Schedules all sections of the `LazyResolved` `raw` to be merged
+    with the DEFAULT values `defaults` (a snapshot).
+    '''
+    proxies = getattr(self.parser, '_proxies', None)
+    for name in raw.ops:
+      self.names[name] = True
+      self.pending.setdefault(name, []).append((raw, defaults))
+      if proxies is not None and name not in proxies:
+        proxies[name] = CP.SectionProxy(self.parser, name)
+
+  #----------------------------------------------------------------------------
+  def __getitem__(self, name):
+    if name in self.pending:
+      with self.lock:
+        ops = self.pending.get(name)
+        if ops is not None:
+          ret = self.data.get(name)
+          if ret is None:
+            ret = self.parser._dict()
+          for raw, defaults in ops:
+            _merge(ret, six.iteritems(raw.section(name)), defaults)
+          self.data[name] = ret
+          del self.pending[name]
+          return ret
+    return self.data[name]
+
+  #----------------------------------------------------------------------------
+  def __setitem__(self, name, value):
+    with self.lock:
+      self.pending.pop(name, None)
+      self.names[name] = True
+      self.data[name] = value
+
+  #----------------------------------------------------------------------------
+  def __delitem__(self, name):
+    with self.lock:
+      del self.names[name]
+      self.pending.pop(name, None)
+      self.data.pop(name, None)
+
+  #----------------------------------------------------------------------------
+  def __contains__(self, name):
+    return name in self.names
+
+  def __iter__(self):
+    return iter(list(self.names))
+
+  def __len__(self):
+    return len(self.names)
+
+  def copy(self):
+    return self.parser._dict((name, self[name]) for name in self.names)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -7,26 +7,39 @@
 #------------------------------------------------------------------------------
 
 import io
+import re
+import mmap
+import locale
 import os.path
 import warnings
+import contextlib
+import collections
 
 import six
 from six.moves import configparser as CP
 from six.moves import urllib
+from six.moves import intern
 try:
   from collections import OrderedDict
 except ImportError:
   OrderedDict = dict
+try:
+  from collections.abc import Mapping
+except ImportError:
+  from collections import Mapping
 
 # TODO: PY3 added a `ConfigParser.read_dict` that should probably
 #       be overridden as well...
 # TODO: should `ConfigParser.set()` be checked for option==INHERITTAG?...
 
 from . import interpolation
+from . import fastparse
+from .instrument import timer as _timer
 
 __all__ = (
-  'Loader', 'IniheritMixin', 'RawConfigParser',
-  'ConfigParser', 'SafeConfigParser',
+  'Loader', 'MmapLoader', 'FileCache', 'IniheritMixin', 'RawConfigParser',
+  'ConfigParser', 'SafeConfigParser', 'ChangeSet',
+  'enable_shared_cache', 'disable_shared_cache', 'clear_shared_cache',
   'DEFAULT_INHERITTAG',
 )
 
@@ -40,16 +53,216 @@ DEFAULT_INHERITTAG = '%inherit'
 
 #------------------------------------------------------------------------------
 class Loader(object):
+  # note: the returned file-like object is owned (and closed) by the
+  #       parser; if it is a context manager, it is used as one.
   def load(self, name, encoding=None):
-    # todo: these fp are leaked... need to use "contextlib.closing" somehow...
     if encoding is None:
       return open(name)
     return open(name, encoding=encoding)
 
+#------------------------------------------------------------------------------
+class MmapLoader(Loader):
+  '''
+  A :class:`Loader` for very large files: each file is memory-mapped
+  and decoded in a single bulk operation, and then served to the
+  parser from an in-memory text buffer. The file and the mapping are
+  released before :meth:`load` returns.
+  '''
+  def load(self, name, encoding=None):
+    encoding = encoding or locale.getpreferredencoding(False)
+    with open(name, 'rb') as fp:
+      if os.fstat(fp.fileno()).st_size == 0:
+        data = b''.decode(encoding)
+      else:
+        with contextlib.closing(
+            mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)) as buf:
+          if six.PY2:
+            data = buf[:].decode(encoding)
+          else:
+            # note: decodes straight from the mapping (without an
+            #       intermediate `bytes` copy); the view must be
+            #       released before the mapping can be closed.
+            view = memoryview(buf)
+            try:
+              data = str(view, encoding)
+            finally:
+              view.release()
+    if '\r' in data:
+      # universal newlines, as with text-mode `open`
+      data = data.replace('\r\n', '\n').replace('\r', '\n')
+    ret = io.StringIO(data)
+    ret.name = name
+    return ret
+
+#------------------------------------------------------------------------------
+def _closing(fp):
+  # returns a context manager that closes the loaded file `fp`
+  if hasattr(fp, '__exit__'):
+    return fp
+  return contextlib.closing(fp)
+
+
+#------------------------------------------------------------------------------
+def _filestat(name):
+  '''
+  Returns a ``(mtime_ns, size)`` tuple for the file `name`, or
+  ``None`` if it cannot be `stat`'ed.
+  '''
+  try:
+    stat = os.stat(name)
+  except (OSError, IOError):
+    return None
+  mtime = getattr(stat, 'st_mtime_ns', None)
+  if mtime is None:
+    mtime = int(stat.st_mtime * 1000000000)
+  return (mtime, stat.st_size)
+
+
+#------------------------------------------------------------------------------
+class FileCache(object):
+  '''
+  A cache of fully-resolved INI files that can be shared across parser
+  instances, e.g.::
+
+    cache = iniherit.FileCache()
+    cfg1  = iniherit.SafeConfigParser(filecache=cache)
+    cfg2  = iniherit.SafeConfigParser(filecache=cache)
+
+  Each entry remembers the modification time and size of every file
+  that contributed to it (including inherited files and missing
+  optional files), and is discarded as soon as any of them changes.
+  Files that cannot be `stat`'ed (e.g. those served by a custom
+  :class:`Loader`) and files whose ``%inherit`` targets use
+  interpolation are never stored.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self):
+    self.entries = dict()
+
+  #----------------------------------------------------------------------------
+  def get(self, key):
+    entry = self.entries.get(key)
+    if entry is None:
+      return None
+    for name, stat in entry._im_files.items():
+      if _filestat(name) != stat:
+        self.entries.pop(key, None)
+        return None
+    return entry
+
+  #----------------------------------------------------------------------------
+  def put(self, key, parser):
+    self.entries[key] = parser
+
+  #----------------------------------------------------------------------------
+  def clear(self):
+    self.entries.clear()
+
+#------------------------------------------------------------------------------
+_shared_cache = None
+
+def enable_shared_cache(cache=None):
+  '''
+  Enables the process-wide :class:`FileCache` `cache` (or a new one),
+  which is then used by every parser that was not created with an
+  explicit `filecache` (or with ``filecache=False``). This way, all
+  parsers that read the same file (e.g. those of the application, of
+  paste-deploy and of the logging configuration) resolve it only once
+  per process, for as long as it does not change. Returns the cache.
+  '''
+  global _shared_cache
+  _shared_cache = cache if cache is not None else FileCache()
+  return _shared_cache
+
+def disable_shared_cache():
+  'Disables (and discards) the process-wide :class:`FileCache`.'
+  global _shared_cache
+  _shared_cache = None
+
+def clear_shared_cache():
+  'Removes all entries from the process-wide :class:`FileCache`.'
+  if _shared_cache is not None:
+    _shared_cache.clear()
+
+
+#------------------------------------------------------------------------------
+def _rawsection(parser, section):
+  '''
+  Returns the raw option storage of `parser` for `section` (which may
+  be the DEFAULT section).
+  '''
+  if section == getattr(parser, 'default_section', CP.DEFAULTSECT):
+    return parser._defaults
+  try:
+    return parser._sections[section]
+  except KeyError:
+    raise CP.NoSectionError(section)
+
+#------------------------------------------------------------------------------
+def _rawitems(parser, section):
+  '''
+  Returns a list of the raw ``(option, value)`` pairs that are
+  explicitly defined in `section` of `parser`, i.e. excluding any
+  values provided by the DEFAULT section.
+  '''
+  # note: PY2 stores the section name in each section as "__name__"
+  return [
+    (option, value)
+    for option, value in _rawsection(parser, section).items()
+    if option != '__name__']
+
+#------------------------------------------------------------------------------
+class ChangeSet(collections.namedtuple('ChangeSet', ('added', 'removed', 'changed'))):
+  '''
+  The differences between two versions of a configuration, as sorted
+  lists of ``(section, option)`` pairs (see
+  :meth:`IniheritMixin.reload_if_changed`).
+  '''
+  __slots__ = ()
+
+#------------------------------------------------------------------------------
+def _rawvalues(parser):
+  # returns a dict mapping (section, option) => raw value, including
+  # the DEFAULT values inherited by each section
+  defsect = getattr(parser, 'default_section', CP.DEFAULTSECT)
+  defaults = _rawitems(parser, defsect)
+  ret = dict(((defsect, option), value) for option, value in defaults)
+  for section in parser.sections():
+    for option, value in defaults + _rawitems(parser, section):
+      ret[(section, option)] = value
+  return ret
+
+def _diff(before, after):
+  return ChangeSet(
+    added   = sorted(key for key in after if key not in before),
+    removed = sorted(key for key in before if key not in after),
+    changed = sorted(
+      key for key, value in after.items()
+      if key in before and before[key] != value))
+
+#------------------------------------------------------------------------------
+_option_cre = re.compile(r'([^:=\s][^:=]*)[:=]')
+
+#------------------------------------------------------------------------------
+def _basic_interpolate(parser, section, option, value, vars):
+  # note: like PY2's `ConfigParser._interpolate`, values without any
+  #       "%(" references (e.g. URL-encoded "%inherit" targets) are
+  #       returned as-is.
+  if '%(' not in value:
+    return value
+  return interpolation._real_BasicInterpolation_before_get(
+    _basic_interpolation, parser, section, option, value, vars)
+_basic_interpolation = interpolation._real_BasicInterpolation()
 
 #------------------------------------------------------------------------------
 def _get_real_interpolate(parser):
   # todo: should this be sensitive to `parser`?...
+  # note: PY3 does not have a `ConfigParser._interpolate` (if it
+  #       exists, it was installed by `install_globally`), so the
+  #       original `BasicInterpolation` is used instead.
+  if six.PY3:
+    return _basic_interpolate
   return \
     getattr(_real_ConfigParser, '_iniherit__interpolate', None) \
     or getattr(_real_ConfigParser, '_interpolate', None)
@@ -63,25 +276,89 @@ class IniheritMixin(object):
   IM_INHERITTAG  = DEFAULT_INHERITTAG
   IM_DEFAULTSECT = CP.DEFAULTSECT
 
+  # the keyword parameters accepted by `IniheritMixin.__init__`
+  IM_PARAMS = ('loader', 'filecache', 'prefetch_workers', 'lazy', 'track_provenance',
+               'hook', 'fastparse', 'diskcache')
+
   #----------------------------------------------------------------------------
   def __init__(self, *args, **kw):
     self.loader = kw.get('loader', None) or Loader()
+    self.filecache = kw.get('filecache', None)
+    self.prefetch_workers = kw.get('prefetch_workers', None)
+    self.lazy = kw.get('lazy', False)
+    self.track_provenance = bool(kw.get('track_provenance', False))
+    self.hook = kw.get('hook', None)
+    self.fastparse = kw.get('fastparse', False)
+    self.diskcache = kw.get('diskcache', None)
+    if self.lazy and self.track_provenance:
+      raise ValueError(
+        'the "lazy" and "track_provenance" modes are mutually exclusive')
     self.inherit = True
     self.IM_INHERITTAG  = DEFAULT_INHERITTAG
     self.IM_DEFAULTSECT = getattr(self, 'default_section', CP.DEFAULTSECT)
 
   #----------------------------------------------------------------------------
   def read(self, filenames, encoding=None):
+    ret = self._im_read(filenames, encoding)
+    self._im_recordRead(filenames, encoding)
+    return ret
+
+  #----------------------------------------------------------------------------
+  def aread(self, filenames, encoding=None, loader=None):
+    '''
+    A coroutine version of :meth:`read` that loads ``%inherit`` targets
+    concurrently via the :class:`iniherit.aio.AsyncLoader` `loader`
+    (which defaults to one that wraps this parser's loader). The
+    result is identical to that of :meth:`read`. Requires Python 3.5+.
+    '''
+    from .aio import aread
+    return aread(self, filenames, encoding=encoding, loader=loader)
+
+  #----------------------------------------------------------------------------
+  def _im_read(self, filenames, encoding=None, parsed=None, memo=None,
+               resolved=None):
+    # note: `parsed` and `memo` (see :meth:`_im_readFile`) can be
+    #       supplied by callers that re-read the same files repeatedly
+    #       and invalidate changed entries themselves. `resolved` maps
+    #       filenames to their already looked up `DiskCache` results.
     if isinstance(filenames, six.string_types):
       filenames = [filenames]
+    if parsed is None and getattr(self, 'prefetch_workers', None) \
+        and self._im_inheriting():
+      from .prefetch import Prefetcher
+      parsed = Prefetcher(self, encoding, self.prefetch_workers)
+      try:
+        for filename in filenames:
+          parsed.submit(filename)
+        return self._im_read(
+          filenames, encoding=encoding, parsed=parsed, memo=memo,
+          resolved=resolved)
+      finally:
+        parsed.close()
     read_ok = []
+    if memo is None:
+      memo = dict()
     for filename in filenames:
-      try:
-        fp = self._load(filename, encoding=encoding)
-      except IOError:
-        continue
-      self._read(fp, filename, encoding=encoding)
-      fp.close()
+      if not self._im_inheriting():
+        try:
+          fp = self._load(filename, encoding=encoding)
+        except IOError:
+          continue
+        with _closing(fp) as fp:
+          self._read(fp, filename, encoding=encoding)
+      else:
+        if resolved is not None and filename in resolved:
+          raw = resolved[filename]
+        else:
+          raw = self._im_diskcached(filename, encoding)
+        if raw is None:
+          raw = self._im_readFile(
+            filename, encoding, memo, optional=True, parsed=parsed)
+          if raw is None:
+            continue
+          self._im_diskstore(filename, encoding, raw)
+        self._im_track(raw)
+        self._im_timed('merge', filename, self._im_merge, raw)
       read_ok.append(filename)
     return read_ok
 
@@ -91,11 +368,16 @@ class IniheritMixin(object):
       self.loader = Loader()
     return self.loader.load(filename, encoding=encoding)
 
+  #----------------------------------------------------------------------------
+  def _im_inheriting(self):
+    return getattr(self, 'inherit', True) or not hasattr(self, '_iniherit__read')
+
   #----------------------------------------------------------------------------
   def _read(self, fp, fpname, encoding=None):
-    if getattr(self, 'inherit', True) or not hasattr(self, '_iniherit__read'):
+    if self._im_inheriting():
       raw = self._readRecursive(fp, fpname, encoding=encoding)
-      self._apply(raw, self)
+      self._im_track(raw)
+      self._im_timed('merge', fpname, self._im_merge, raw)
     else:
       self._iniherit__read(fp, fpname)
 
@@ -104,96 +386,522 @@ class IniheritMixin(object):
     ret = _real_RawConfigParser() if raw else _real_ConfigParser()
     ret.inherit = False
     ## TODO: any other configurations that need to be copied into `ret`??...
-    ret.optionxform = self.optionxform
+    # note: a bound `optionxform` is re-bound to `ret` so that resolved
+    #       parsers held by a `FileCache` do not keep `self` alive.
+    xform = self.optionxform
+    if getattr(xform, '__self__', None) is self:
+      xform = six.create_bound_method(six.get_method_function(xform), ret)
+    ret.optionxform = xform
     return ret
 
   #----------------------------------------------------------------------------
-  def _readRecursive(self, fp, fpname, encoding=None):
+  def _im_cachekey(self, name, encoding):
+    # note: the loader type is included because loaders may serve
+    #       different content for the same name.
+    xform = self.optionxform
+    xform = getattr(xform, '__func__', xform)
+    loader = getattr(self, 'loader', None)
+    return (
+      os.path.abspath(name), encoding, xform,
+      type(loader) if loader is not None else Loader,
+      self.IM_INHERITTAG, self.IM_DEFAULTSECT,
+      bool(getattr(self, 'lazy', False)),
+      bool(getattr(self, 'track_provenance', False)))
+
+  #----------------------------------------------------------------------------
+  def _im_filecache(self):
+    cache = getattr(self, 'filecache', None)
+    if cache is None:
+      return _shared_cache
+    return cache or None
+
+  #----------------------------------------------------------------------------
+  def _im_diskcache(self):
+    cache = getattr(self, 'diskcache', None)
+    if cache is True:
+      from .diskcache import DiskCache
+      cache = self.diskcache = DiskCache()
+    return cache or None
+
+  #----------------------------------------------------------------------------
+  def _im_diskcached(self, name, encoding):
+    # returns the resolved file `name` from the `DiskCache`, or None
+    cache = self._im_diskcache()
+    entry = cache.load(self, name, encoding) if cache is not None else None
+    if entry is None:
+      return None
+    files, defaults, sections = entry
     ret = self._makeParser()
+    self._im_update_raw(ret, self.IM_DEFAULTSECT, defaults)
+    for section, items in sections:
+      ret.add_section(section)
+      self._im_update_raw(ret, section, items)
+    if getattr(self, 'lazy', False):
+      from .lazy import LazyResolved
+      src, ret = ret, LazyResolved(self.IM_DEFAULTSECT)
+      ret.addResolved(src)
+    ret._im_files = OrderedDict(files)
+    ret._im_cacheable = True
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _im_diskstore(self, name, encoding, raw):
+    cache = self._im_diskcache()
+    if cache is not None:
+      cache.store(self, name, encoding, raw)
+
+  #----------------------------------------------------------------------------
+  def _im_cached(self, key, memo):
+    ret = memo.get(key)
+    if ret is None:
+      cache = self._im_filecache()
+      if cache is not None:
+        ret = cache.get(key)
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _im_readFile(self, name, encoding, memo, optional=False, parsed=None):
+    '''
+    Returns the fully-resolved parser for the file `name`. Resolved
+    files are memoized in `memo` (so that diamond inheritance and
+    section-level inheritance only parse a file once per read) and,
+    if configured, in the shared :class:`FileCache`. If `optional` is
+    truthy and the file cannot be loaded, ``None`` is returned.
+
+    If specified, `parsed` maps cache keys to the (possibly
+    pre-fetched) results of :meth:`_im_loadFile`, and is updated with
+    any file that is parsed.
+    '''
+    key = self._im_cachekey(name, encoding)
+    ret = self._im_cached(key, memo)
+    if ret is None:
+      item = parsed.get(key) if parsed is not None else None
+      if item is None:
+        item = self._im_loadFile(name, encoding)
+        if parsed is not None:
+          parsed[key] = item
+      if isinstance(item, IOError):
+        if optional:
+          return None
+        raise item
+      if isinstance(item, Exception):
+        raise item
+      src, inherits, stat = item
+      ret = self._im_resolve(src, inherits, encoding, memo, parsed)
+      files = OrderedDict([(key[0], stat)])
+      files.update(ret._im_files)
+      ret._im_files = files
+      if stat is None:
+        ret._im_cacheable = False
+      cache = self._im_filecache()
+      if cache is not None and ret._im_cacheable:
+        cache.put(key, ret)
+    memo[key] = ret
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _im_loadFile(self, name, encoding):
+    '''
+    Loads and parses the file `name`, and returns a tuple of ``(src,
+    inherits, stat)`` as described by :meth:`_im_parse`, where `stat`
+    is the file's stat signature. Errors are returned, not raised.
+    '''
+    stat = _filestat(name)
+    hook = getattr(self, 'hook', None)
+    if hook is not None:
+      start = _timer()
+    try:
+      fp = self._load(name, encoding=encoding)
+    except IOError as err:
+      return err
+    try:
+      with _closing(fp) as fp:
+        if hook is not None:
+          # note: the file is read in bulk so that I/O and parsing can
+          #       be timed separately.
+          data = fp.read()
+          hook('load', name, _timer() - start, size=len(data))
+          fp = six.StringIO(data)
+          return self._im_timedParse(fp, name) + (stat,)
+        return self._im_parse(fp, name) + (stat,)
+    except Exception as err:
+      return err
+
+  #----------------------------------------------------------------------------
+  def _im_track(self, raw):
+    # records the files (and their stats) that contributed to `self`,
+    # and whether or not all of them can be cached
+    files = getattr(self, '_im_files', None)
+    if files is None:
+      files = self._im_files = OrderedDict()
+    files.update(raw._im_files)
+    self._im_cacheable = \
+      getattr(self, '_im_cacheable', True) and raw._im_cacheable
+
+  #----------------------------------------------------------------------------
+  def _im_recordRead(self, filenames, encoding):
+    # records a `read` call, so that `reload_if_changed` can replay it
+    if isinstance(filenames, six.string_types):
+      filenames = [filenames]
+    reads = getattr(self, '_im_reads', None)
+    if reads is None:
+      reads = self._im_reads = []
+    reads.append((list(filenames), encoding))
+
+  #----------------------------------------------------------------------------
+  def watch(self, callback):
+    '''
+    Registers `callback` to be called with a :class:`ChangeSet` by
+    :meth:`reload_if_changed` whenever a reload changes any value.
+    Returns `callback`, so that this can be used as a decorator.
+    '''
+    watchers = getattr(self, '_im_watchers', None)
+    if watchers is None:
+      watchers = self._im_watchers = []
+    watchers.append(callback)
+    return callback
+
+  #----------------------------------------------------------------------------
+  def unwatch(self, callback):
+    'Unregisters a `callback` that was registered with :meth:`watch`.'
+    getattr(self, '_im_watchers', []).remove(callback)
+
+  #----------------------------------------------------------------------------
+  def changed_files(self):
+    '''
+    Returns the list of files that contributed to this parser (see
+    :meth:`read`) and that were modified, created or deleted since.
+    Files that cannot be `stat`'ed (e.g. those served by a custom
+    :class:`Loader`) are never reported.
+    '''
+    return [
+      name
+      for name, stat in (getattr(self, '_im_files', None) or dict()).items()
+      if _filestat(name) != stat]
+
+  #----------------------------------------------------------------------------
+  def reload_if_changed(self):
+    '''
+    Checks whether any file that contributed to this parser changed
+    and, if so, clears the parser and re-reads the files of all
+    previous :meth:`read` calls. Returns ``None`` if nothing changed,
+    and otherwise a :class:`ChangeSet` of the ``(section, option)``
+    pairs whose raw (i.e. un-interpolated) values were added, removed
+    or changed, which is also passed to all callbacks registered with
+    :meth:`watch` (if it is not empty). Values of a section include
+    the DEFAULT values that it inherits.
+
+    Note that any values that were not loaded via `read` (e.g. via
+    `set`) are discarded. If re-reading fails, the previous state is
+    restored and the error is raised.
+    '''
+    if not self.changed_files():
+      return None
+    before = _rawvalues(self)
+    state = self._im_resetStorage()
+    try:
+      for filenames, encoding in getattr(self, '_im_reads', None) or []:
+        self._im_read(filenames, encoding)
+    except Exception:
+      self._im_resetStorage(state)
+      raise
+    ret = _diff(before, _rawvalues(self))
+    if ret.added or ret.removed or ret.changed:
+      for callback in list(getattr(self, '_im_watchers', None) or []):
+        callback(ret)
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _im_resetStorage(self, state=None):
+    # replaces the option storage (and related state) of this parser
+    # with `state` (or empty storage) and returns the previous state.
+    names = (
+      '_sections', '_defaults', '_proxies', '_im_files', '_im_prov',
+      '_im_cacheable')
+    ret = dict((name, getattr(self, name, None)) for name in names)
+    if state is None:
+      state = dict(
+        _sections=self._dict(), _defaults=self._dict(), _im_cacheable=True)
+      if ret['_proxies'] is not None:
+        state['_proxies'] = self._dict()
+        state['_proxies'][self.IM_DEFAULTSECT] = \
+          CP.SectionProxy(self, self.IM_DEFAULTSECT)
+    for name in names:
+      value = state.get(name)
+      if value is not None or hasattr(self, name):
+        setattr(self, name, value)
+    clear = getattr(self, 'clear_cache', None)
+    if clear is not None:
+      clear()
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _readRecursive(self, fp, fpname, encoding=None, memo=None):
+    if memo is None:
+      memo = dict()
+    src, inherits = self._im_timedParse(fp, fpname)
+    return self._im_resolve(src, inherits, encoding, memo, None)
+
+  #----------------------------------------------------------------------------
+  def _im_timedParse(self, fp, fpname):
+    hook = getattr(self, 'hook', None)
+    if hook is None:
+      return self._im_parse(fp, fpname)
+    start = _timer()
+    ret = self._im_parse(fp, fpname)
+    hook('parse', fpname, _timer() - start,
+         sections=len(ret[0].sections()), inherits=len(ret[1]))
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _im_timed(self, event, name, func, *args, **info):
+    # calls `func(*args)`, reporting its duration to the hook (if any)
+    hook = getattr(self, 'hook', None)
+    if hook is None:
+      return func(*args)
+    start = _timer()
+    try:
+      return func(*args)
+    finally:
+      hook(event, name, _timer() - start, **info)
+
+  #----------------------------------------------------------------------------
+  def _im_parse(self, fp, fpname):
+    '''
+    Parses the INI file `fp` and extracts (i.e. removes and
+    interpolates) its ``%inherit`` options. Returns a tuple of ``(src,
+    inherits)``, where `inherits` is a list of ``(section, fromsect,
+    name, optional)`` tuples in the order in which they must be
+    applied; `section` is ``None`` for file-level inheritance.
+    '''
     src = self._makeParser()
-    src.readfp(fp, fpname)
+    src._im_name = fpname
+    fast = getattr(self, 'fastparse', False)
+    prov = getattr(self, 'track_provenance', False)
+    if fast or prov:
+      data = fp.read()
+      if not fast or not fastparse.parse(src, data):
+        src.readfp(six.StringIO(data), fpname)
+      if prov:
+        src._im_prov = self._im_scanProvenance(src, data, fpname)
+    else:
+      src.readfp(fp, fpname)
+    src._im_dynamic = False
     dirname = os.path.dirname(fpname)
-    if src.has_option(self.IM_DEFAULTSECT, self.IM_INHERITTAG):
-      inilist = src.get(self.IM_DEFAULTSECT, self.IM_INHERITTAG)
-      src.remove_option(self.IM_DEFAULTSECT, self.IM_INHERITTAG)
-      inilist = self._interpolate_with_vars(
-        src, self.IM_DEFAULTSECT, self.IM_INHERITTAG, inilist)
-      for curname in inilist.split():
-        optional = curname.startswith('?')
-        if optional:
-          curname = curname[1:]
-        curname = os.path.join(dirname, urllib.parse.unquote(curname))
-        try:
-          curfp = self._load(curname, encoding=encoding)
-        except IOError:
-          if optional:
-            continue
-          raise
-        self._apply(self._readRecursive(curfp, curname, encoding=encoding), ret)
-    for section in src.sections():
+    inherits = []
+    for section in [self.IM_DEFAULTSECT] + src.sections():
       if not src.has_option(section, self.IM_INHERITTAG):
         continue
       inilist = src.get(section, self.IM_INHERITTAG)
       src.remove_option(section, self.IM_INHERITTAG)
+      getattr(src, '_im_prov', {}).pop((section, self.IM_INHERITTAG), None)
+      if '%(' in inilist:
+        src._im_dynamic = True
       inilist = self._interpolate_with_vars(
         src, section, self.IM_INHERITTAG, inilist)
       for curname in inilist.split():
         optional = curname.startswith('?')
         if optional:
           curname = curname[1:]
-        fromsect = section
-        if '[' in curname and curname.endswith(']'):
-          curname, fromsect = curname.split('[', 1)
-          fromsect = urllib.parse.unquote(fromsect[:-1])
+        if section == self.IM_DEFAULTSECT:
+          target = fromsect = None
+        else:
+          target = fromsect = section
+          if '[' in curname and curname.endswith(']'):
+            curname, fromsect = curname.split('[', 1)
+            fromsect = urllib.parse.unquote(fromsect[:-1])
         curname = os.path.join(dirname, urllib.parse.unquote(curname))
-        try:
-          curfp = self._load(curname, encoding=encoding)
-        except IOError:
-          if optional:
-            continue
-          raise
-        self._apply(self._readRecursive(curfp, curname, encoding=encoding), ret,
-                    sections={fromsect: section})
-    self._apply(src, ret)
+        inherits.append((target, fromsect, curname, optional))
+    return (src, inherits)
+
+  #----------------------------------------------------------------------------
+  def _im_resolve(self, src, inherits, encoding, memo, parsed):
+    # applies the resolved `inherits` of `src`, and then `src` itself,
+    # to a new parser (or, in lazy mode, `LazyResolved`), which is
+    # returned.
+    lazy = getattr(self, 'lazy', False)
+    if lazy:
+      from .lazy import LazyResolved
+      ret = LazyResolved(self.IM_DEFAULTSECT)
+    else:
+      ret = self._makeParser()
+      ret._im_files = OrderedDict()
+    ret._im_cacheable = not src._im_dynamic
+    for section, fromsect, curname, optional in inherits:
+      sub = self._im_readFile(
+        curname, encoding, memo, optional=optional, parsed=parsed)
+      if sub is None:
+        ret._im_files[os.path.abspath(curname)] = None
+        continue
+      ret._im_files.update(sub._im_files)
+      ret._im_cacheable = ret._im_cacheable and sub._im_cacheable
+      if lazy:
+        if section is None:
+          ret.addFile(sub)
+        else:
+          ret.addSection(sub, fromsect, section)
+      elif section is None:
+        self._im_timed('merge', curname, self._apply, sub, ret)
+      else:
+        self._im_timed(
+          'merge', curname, self._apply, sub, ret, {fromsect: section},
+          section=section)
+    if lazy:
+      ret.addSource(src)
+    else:
+      self._im_timed('merge', src._im_name, self._apply, src, ret)
     return ret
 
+  #----------------------------------------------------------------------------
+  def _im_merge(self, raw):
+    # applies the resolved file `raw` to `self`; in lazy mode, only the
+    # DEFAULT section is merged immediately, and all other sections
+    # when they are first accessed (see `iniherit.lazy`).
+    if not getattr(self, 'lazy', False):
+      return self._apply(raw, self)
+    from .lazy import LazySections
+    defaults = _rawsection(self, self.IM_DEFAULTSECT)
+    self._im_update_raw(self, self.IM_DEFAULTSECT, [
+      (option, interpolation.substitute_super(value, defaults.get(option)))
+      for option, value in raw.defaults.items()])
+    if not isinstance(self._sections, LazySections):
+      self._sections = LazySections(self, self._sections)
+    self._sections.add(raw, dict(defaults))
+
   #----------------------------------------------------------------------------
   def _apply(self, src, dst, sections=None):
-    # todo: this does not detect the case that a section overrides
-    #       the default section with the exact same value... ugh.
-    if sections is None:
-      for option, value in src.items(self.IM_DEFAULTSECT):
-        value = interpolation.interpolate_super(
-          self, src, dst, self.IM_DEFAULTSECT, option, value)
-        self._im_setraw(dst, self.IM_DEFAULTSECT, option, value)
+    # note: this operates directly on the raw option storage of `src`
+    #       and `dst` so that only the options that a section actually
+    #       defines are copied (i.e. DEFAULT values are not merged into
+    #       every section) and no interpolation is performed. each
+    #       section is written to `dst` with a single bulk update.
+    dstdefaults = _rawsection(dst, self.IM_DEFAULTSECT)
+    srcprov = getattr(src, '_im_prov', None)
+    dstprov = None
+    if srcprov is not None:
+      dstprov = getattr(dst, '_im_prov', None)
+      if dstprov is None:
+        dstprov = dst._im_prov = dict()
+    substitute = interpolation.substitute_super
     if sections is None:
+      items = []
+      for option, value in _rawitems(src, self.IM_DEFAULTSECT):
+        inherited = dstdefaults.get(option)
+        if dstprov is not None:
+          self._im_traceValue(
+            srcprov, dstprov, self.IM_DEFAULTSECT, self.IM_DEFAULTSECT,
+            option, value, inherited)
+        items.append((option, substitute(value, inherited)))
+      self._im_update_raw(dst, self.IM_DEFAULTSECT, items)
       sections = OrderedDict([(s, s) for s in src.sections()])
     for srcsect, dstsect in sections.items():
       if not dst.has_section(dstsect):
         dst.add_section(dstsect)
-      for option, value in src.items(srcsect):
-        # todo: this is a *terrible* way of detecting if this option is
-        #       defaulting...
-        if src.has_option(self.IM_DEFAULTSECT, option) \
-            and value == src.get(self.IM_DEFAULTSECT, option):
+      dstsection = _rawsection(dst, dstsect)
+      items = []
+      for option, value in _rawitems(src, srcsect):
+        inherited = dstsection.get(option)
+        if inherited is None:
+          inherited = dstdefaults.get(option)
+        if dstprov is not None:
+          self._im_traceValue(
+            srcprov, dstprov, srcsect, dstsect, option, value, inherited)
+        items.append((option, substitute(value, inherited)))
+      self._im_update_raw(dst, dstsect, items)
+
+  #----------------------------------------------------------------------------
+  def _im_traceValue(self, srcprov, dstprov, srcsect, dstsect, option,
+                     value, inherited):
+    # records the provenance of `value` being merged into `dstsect`.
+    # provenance nodes are ``(file, line, raw, prev)`` tuples that are
+    # shared between all parsers that contain the value; `prev` is the
+    # node of the value that "%(SUPER)s" was substituted with.
+    node = srcprov.get((srcsect, option))
+    if node is None:
+      return
+    if inherited is not None and '%(SUPER' in value:
+      prev = dstprov.get((dstsect, option))
+      if prev is None:
+        prev = dstprov.get((self.IM_DEFAULTSECT, option))
+      node = node[:3] + (prev,)
+    dstprov[(dstsect, option)] = node
+
+  #----------------------------------------------------------------------------
+  def _im_scanProvenance(self, src, data, fpname):
+    # a light-weight scan of the INI text `data` for the line numbers
+    # of all options; returns a provenance dict of leaf nodes.
+    ret = dict()
+    if not fpname.startswith('<'):
+      fpname = os.path.abspath(fpname)
+    fpname = intern(str(fpname))
+    xform = src.optionxform
+    values = None
+    for lineno, line in enumerate(data.splitlines(), 1):
+      if not line or line[0] in ' \t#;':
+        continue
+      if line[0] == '[':
+        # note: headers are matched just as `src` matched them, since
+        #       e.g. the handling of "]" in names depends on the version.
+        header = src.SECTCRE.match(line.strip())
+        if header:
+          section = header.group('header')
+          try:
+            values = _rawsection(src, section)
+          except CP.NoSectionError:
+            values = None
           continue
-        value = interpolation.interpolate_super(
-          self, src, dst, dstsect, option, value)
-        self._im_setraw(dst, dstsect, option, value)
+      if values is None:
+        continue
+      match = _option_cre.match(line)
+      if not match:
+        continue
+      option = xform(match.group(1).rstrip())
+      value = values.get(option)
+      if value is not None:
+        ret[(section, option)] = (fpname, lineno, value, None)
+    return ret
+
+  #----------------------------------------------------------------------------
+  def provenance(self, section, option):
+    '''
+    Returns the list of ``(filename, line, raw)`` tuples that produced
+    the value of `option` in `section`, starting with the definition
+    that supplied the final value, followed by the values that it
+    inherited via ``%(SUPER)s``. Requires a parser created with
+    ``track_provenance=True``. Options that were not read from a file
+    yield an empty list; note that changes made via `set` are not
+    tracked.
+    '''
+    prov = getattr(self, '_im_prov', None) or dict()
+    option = self.optionxform(option)
+    node = prov.get((section, option))
+    if node is None and section != self.IM_DEFAULTSECT \
+        and option not in _rawsection(self, section):
+      node = prov.get((self.IM_DEFAULTSECT, option))
+    ret = []
+    while node is not None:
+      ret.append(node[:3])
+      node = node[3]
+    return ret
+
+  #----------------------------------------------------------------------------
+  def _im_update_raw(self, parser, section, items):
+    '''
+    Sets the raw values of all options in `items` (a mapping or a
+    sequence of ``(option, value)`` pairs) in `section` of `parser`
+    with a single update of its option storage, i.e. without any
+    interpolation checks or hooks (which makes it safe to call
+    concurrently on different parsers).
+    '''
+    if isinstance(items, Mapping):
+      items = items.items()
+    xform = parser.optionxform
+    _rawsection(parser, section).update(
+      (xform(option), value) for option, value in items)
 
   #----------------------------------------------------------------------------
   def _im_setraw(self, parser, section, option, value):
-    if six.PY3 and hasattr(parser, '_interpolation'):
-      # todo: don't do this for systems that have
-      #       http://bugs.python.org/issue21265 fixed
-      try:
-        tmp = parser._interpolation.before_set
-        parser._interpolation.before_set = lambda self,s,o,v,*a,**k: v
-        _real_RawConfigParser.set(parser, section, option, value)
-      finally:
-        parser._interpolation.before_set = tmp
-    else:
-      _real_RawConfigParser.set(parser, section, option, value)
+    self._im_update_raw(parser, section, ((option, value),))
 
   #----------------------------------------------------------------------------
   def _interpolate_with_vars(self, parser, section, option, rawval):
@@ -221,23 +929,83 @@ class IniheritMixin(object):
       RuntimeWarning)
 
 
+#------------------------------------------------------------------------------
+def _pop_params(kw, names):
+  return dict((name, kw.pop(name)) for name in names if name in kw)
+
 #------------------------------------------------------------------------------
 # todo: i'm a little worried about the diamond inheritance here...
 class RawConfigParser(IniheritMixin, _real_RawConfigParser):
   _DEFAULT_INTERPOLATION = interpolation.IniheritInterpolation()
   def __init__(self, *args, **kw):
-    loader = kw.pop('loader', None)
-    IniheritMixin.__init__(self, loader=loader)
+    params = _pop_params(kw, IniheritMixin.IM_PARAMS)
+    IniheritMixin.__init__(self, **params)
     _real_RawConfigParser.__init__(self, *args, **kw)
 class ConfigParser(RawConfigParser, _real_ConfigParser):
+  '''
+  An iniherit-enabled `ConfigParser`. If the `valuecache` parameter is
+  truthy, interpolated values returned by :meth:`get` are cached until
+  the configuration is modified via :meth:`read`, :meth:`set`,
+  :meth:`remove_option` or :meth:`remove_section`. Since
+  ``%(ENV:...)s`` values depend on ``os.environ``, call
+  :meth:`clear_cache` when the environment changes.
+  '''
   def __init__(self, *args, **kw):
-    loader = kw.pop('loader', None)
-    RawConfigParser.__init__(self, loader=loader)
+    params = _pop_params(kw, IniheritMixin.IM_PARAMS)
+    valuecache = kw.pop('valuecache', False)
+    RawConfigParser.__init__(self, **params)
     _real_ConfigParser.__init__(self, *args, **kw)
+    self._im_values = dict() if valuecache else None
+  def clear_cache(self):
+    if getattr(self, '_im_values', None):
+      self._im_values.clear()
+  def get(self, section, option, *args, **kw):
+    cache = getattr(self, '_im_values', None)
+    if cache is None or 'fallback' in kw:
+      return _real_ConfigParser.get(self, section, option, *args, **kw)
+    # note: PY2 accepts `raw` and `vars` as positional parameters
+    raw  = kw.get('raw', args[0] if args else False)
+    vars = kw.get('vars', args[1] if len(args) > 1 else None)
+    if raw:
+      return _real_ConfigParser.get(self, section, option, *args, **kw)
+    key = (
+      section, self.optionxform(option),
+      frozenset(vars.items()) if vars else None)
+    try:
+      return cache[key]
+    except KeyError:
+      pass
+    ret = cache[key] = _real_ConfigParser.get(self, section, option, *args, **kw)
+    return ret
+  def _im_read(self, *args, **kw):
+    try:
+      return RawConfigParser._im_read(self, *args, **kw)
+    finally:
+      self.clear_cache()
+  def _read(self, *args, **kw):
+    try:
+      return RawConfigParser._read(self, *args, **kw)
+    finally:
+      self.clear_cache()
+  def set(self, *args, **kw):
+    try:
+      return _real_ConfigParser.set(self, *args, **kw)
+    finally:
+      self.clear_cache()
+  def remove_option(self, *args, **kw):
+    try:
+      return _real_ConfigParser.remove_option(self, *args, **kw)
+    finally:
+      self.clear_cache()
+  def remove_section(self, *args, **kw):
+    try:
+      return _real_ConfigParser.remove_section(self, *args, **kw)
+    finally:
+      self.clear_cache()
 class SafeConfigParser(ConfigParser, _real_SafeConfigParser):
   def __init__(self, *args, **kw):
-    loader = kw.pop('loader', None)
-    ConfigParser.__init__(self, loader=loader)
+    params = _pop_params(kw, IniheritMixin.IM_PARAMS + ('valuecache',))
+    ConfigParser.__init__(self, **params)
     _real_SafeConfigParser.__init__(self, *args, **kw)
 
 
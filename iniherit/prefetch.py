@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+# note: on Python 2, this module requires the `futures` backport.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ('Prefetcher',)
+
+#------------------------------------------------------------------------------
+class Prefetcher(object):
+  '''
+  Loads and parses INI files, and recursively their ``%inherit``
+  targets, in a thread pool of `workers` threads. It is used by
+  :meth:`iniherit.IniheritMixin.read` when the parser's
+  `prefetch_workers` attribute is set, and acts as the mapping of
+  cache keys to parse results that the merge consumes: :meth:`get`
+  blocks until the requested file has been fetched, so the main
+  thread merges in declaration order while the pool keeps loading.
+
+  Files are loaded with the parser's own loader, which therefore must
+  be thread-safe.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, parser, encoding, workers):
+    self.parser   = parser
+    self.encoding = encoding
+    self.cache    = parser._im_filecache()
+    self.futures  = dict()
+    self.lock     = threading.Lock()
+    self.executor = ThreadPoolExecutor(max_workers=workers)
+
+  #----------------------------------------------------------------------------
+  def submit(self, name):
+    key = self.parser._im_cachekey(name, self.encoding)
+    with self.lock:
+      if key in self.futures:
+        return
+      if self.cache is not None and self.cache.get(key) is not None:
+        return
+      self.futures[key] = self.executor.submit(self._fetch, name)
+
+  #----------------------------------------------------------------------------
+  def _fetch(self, name):
+    # note: the inherited files are submitted *before* this result is
+    #       available, so that they are known by the time the main
+    #       thread merges this file.
+    item = self.parser._im_loadFile(name, self.encoding)
+    if isinstance(item, tuple):
+      for inherit in item[1]:
+        self.submit(inherit[2])
+    return item
+
+  #----------------------------------------------------------------------------
+  def get(self, key, default=None):
+    future = self.futures.get(key)
+    if future is None:
+      return default
+    return future.result()
+
+  #----------------------------------------------------------------------------
+  def __setitem__(self, key, item):
+    # files that were not pre-fetched (e.g. because they were evicted
+    # from the `FileCache` in the meantime) are loaded by the main
+    # thread and need not be remembered.
+    pass
+
+  #----------------------------------------------------------------------------
+  def close(self):
+    self.executor.shutdown(wait=True)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+A configuration that can be shared between, and reloaded while being
+read by, multiple threads (e.g. the workers of a threaded WSGI
+server).
+'''
+
+import threading
+
+from .parser import ConfigParser
+from .frozen import freeze
+
+__all__ = ('SharedConfig',)
+
+#------------------------------------------------------------------------------
+class SharedConfig(object):
+  '''
+  A thread-safe configuration of the INI file(s) `filenames`. Reads
+  are served from an immutable, pre-interpolated :class:`FrozenConfig
+  <iniherit.FrozenConfig>` snapshot without any locking, and
+  :meth:`reload` resolves the files into a new, private parser (created
+  by calling `factory` with `kw`) and then atomically replaces the
+  snapshot. Readers therefore see either the previous or the new
+  configuration, but never a partially merged one. For example::
+
+    config = iniherit.shared.SharedConfig('app.ini', filecache=cache)
+    config.get('app', 'url')
+    config.reload(background=True)
+
+  All read-only `FrozenConfig` methods (e.g. `get`, `getint`,
+  `items`) are available directly on the `SharedConfig`. Since each
+  call uses the snapshot that is current at the time, code that needs
+  multiple consistent values should get them from a single
+  :attr:`config` snapshot.
+
+  If a background reload fails, the previous snapshot is kept, the
+  exception is stored in :attr:`error`, and `onerror` (if specified)
+  is called with it.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, filenames, factory=ConfigParser, encoding=None,
+               onerror=None, **kw):
+    self.filenames = filenames
+    self.factory   = factory
+    self.encoding  = encoding
+    self.onerror   = onerror
+    self.kw        = kw
+    self.error     = None
+    self.files     = ()
+    self._config   = None
+    self._building = threading.Lock()
+    self.reload()
+
+  #----------------------------------------------------------------------------
+  @property
+  def config(self):
+    'The current :class:`FrozenConfig <iniherit.FrozenConfig>` snapshot.'
+    return self._config
+
+  #----------------------------------------------------------------------------
+  def __getattr__(self, name):
+    if name.startswith('_'):
+      raise AttributeError(name)
+    return getattr(self._config, name)
+
+  #----------------------------------------------------------------------------
+  def __contains__(self, section):
+    return section in self._config
+
+  #----------------------------------------------------------------------------
+  def reload(self, background=False):
+    '''
+    Re-reads the configuration files and swaps in the new snapshot,
+    which is returned. If `background` is truthy, the files are read
+    in a new daemon thread instead, which is returned. Concurrent
+    reloads are serialized.
+    '''
+    if not background:
+      return self._reload()
+    thread = threading.Thread(target=self._background, name='iniherit-reload')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+  #----------------------------------------------------------------------------
+  def _reload(self):
+    with self._building:
+      parser = self.factory(**self.kw)
+      parser.read(self.filenames, encoding=self.encoding)
+      config = freeze(parser)
+      self.files  = tuple(getattr(parser, '_im_files', None) or ())
+      self.error  = None
+      # note: a single attribute assignment is atomic, which is what
+      #       makes the lock-free reads safe.
+      self._config = config
+    return config
+
+  #----------------------------------------------------------------------------
+  def _background(self):
+    try:
+      self._reload()
+    except Exception as err:
+      self.error = err
+      if self.onerror is not None:
+        self.onerror(err)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
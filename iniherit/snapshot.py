@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import os
+import copy
+import json
+import hashlib
+import tempfile
+
+import six
+
+from .parser import ConfigParser, RawConfigParser, _filestat, _rawitems
+
+__all__ = ('Snapshot', 'compile_snapshot', 'load_snapshot')
+
+#------------------------------------------------------------------------------
+
+SNAPSHOT_VERSION = 2
+
+#------------------------------------------------------------------------------
+def _filehash(name):
+  hasher = hashlib.sha1()
+  with open(name, 'rb') as fp:
+    for chunk in iter(lambda: fp.read(65536), b''):
+      hasher.update(chunk)
+  return hasher.hexdigest()
+
+#------------------------------------------------------------------------------
+def _ident(value):
+  # returns a process-independent identifier for a callable (e.g. an
+  # optionxform), or None if there is none (e.g. for lambdas).
+  if not callable(value):
+    return value
+  value = getattr(value, '__func__', value)
+  name = getattr(value, '__qualname__', None) or getattr(value, '__name__', None)
+  if not name or '<' in name:
+    return None
+  return value.__module__ + '.' + name
+
+#------------------------------------------------------------------------------
+def _blankParser(parser):
+  # returns a new parser that is configured exactly like `parser` (i.e.
+  # with the same class, constructor parameters, optionxform, loader,
+  # etc.) and has the same DEFAULT values, but no other contents.
+  ret = copy.copy(parser)
+  for name in ('_im_reads', '_im_watchers'):
+    if name in vars(ret):
+      setattr(ret, name, [])
+  if getattr(ret, '_im_values', None) is not None:
+    ret._im_values = dict()
+  ret._im_resetStorage()
+  ret._defaults.update(parser._defaults)
+  return ret
+
+#------------------------------------------------------------------------------
+def _atomic_write(filename, data):
+  dirname = os.path.dirname(os.path.abspath(filename))
+  fd, tmpname = tempfile.mkstemp(
+    dir=dirname, prefix='.' + os.path.basename(filename) + '.')
+  try:
+    with os.fdopen(fd, 'wb') as fp:
+      fp.write(data)
+    getattr(os, 'replace', os.rename)(tmpname, filename)
+  except:
+    try:
+      os.unlink(tmpname)
+    except OSError:
+      pass
+    raise
+
+#------------------------------------------------------------------------------
+class Snapshot(object):
+  '''
+  A fully-resolved ("flattened") INI inheritance tree. A snapshot
+  stores the raw (i.e. un-interpolated) values of all sections,
+  together with the list of files that contributed to them (including
+  missing optional files) and their modification times, sizes and
+  SHA-1 checksums. Snapshots can be saved to and loaded from a compact
+  JSON representation, and can populate a parser without any
+  re-resolution of the inheritance tree.
+
+  Snapshots also record the `optionxform` of the parser they were
+  compiled with, and can only be applied to parsers with the same one.
+  Trees whose ``%inherit`` targets use interpolation (e.g.
+  ``%(ENV:...)s``) depend on more than their files, and their
+  snapshots are therefore never considered fresh.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, root, encoding=None, defaults=None, sections=None,
+               sources=None, optionxform=None, cacheable=True):
+    self.root        = root
+    self.encoding    = encoding
+    self.defaults    = list(defaults or [])
+    self.sections    = list(sections or [])
+    self.sources     = list(sources or [])
+    self.optionxform = optionxform
+    self.cacheable   = cacheable
+
+  #----------------------------------------------------------------------------
+  @classmethod
+  def compile(cls, root, encoding=None, parser=None):
+    '''
+    Resolves the INI file `root` (with the optional, empty parser
+    `parser`, which defaults to a new :class:`iniherit.RawConfigParser`)
+    and returns a snapshot of the result.
+    '''
+    if parser is None:
+      parser = RawConfigParser()
+    root = os.path.abspath(root)
+    if not parser.read(root, encoding=encoding):
+      raise IOError(2, 'No such file or directory', root)
+    sources = []
+    for name, stat in parser._im_files.items():
+      if stat is None:
+        sources.append((name, None, None, None))
+      else:
+        sources.append((name, stat[0], stat[1], _filehash(name)))
+    return cls(
+      root, encoding,
+      defaults    = _rawitems(parser, parser.IM_DEFAULTSECT),
+      sections    = [(sect, _rawitems(parser, sect)) for sect in parser.sections()],
+      sources     = sources,
+      optionxform = _ident(parser.optionxform),
+      cacheable   = getattr(parser, '_im_cacheable', True),
+    )
+
+  #----------------------------------------------------------------------------
+  def isFresh(self):
+    '''
+    Returns whether or not all of the files that contributed to this
+    snapshot are unchanged. Files whose modification time changed but
+    whose size and checksum did not are considered unchanged. Trees
+    that are not cacheable (see :class:`Snapshot`) are never fresh.
+    '''
+    if not self.cacheable:
+      return False
+    for name, mtime, size, digest in self.sources:
+      stat = _filestat(name)
+      if stat is None or mtime is None:
+        if stat is not None or mtime is not None:
+          return False
+        continue
+      if stat == (mtime, size):
+        continue
+      if stat[1] != size:
+        return False
+      try:
+        if _filehash(name) != digest:
+          return False
+      except (IOError, OSError):
+        return False
+    return True
+
+  #----------------------------------------------------------------------------
+  def matches(self, parser):
+    '''
+    Returns whether or not this snapshot can be applied to `parser`,
+    i.e. whether it uses the same (identifiable) `optionxform` as the
+    parser that compiled the snapshot.
+    '''
+    return self.optionxform is not None \
+      and self.optionxform == _ident(parser.optionxform)
+
+  #----------------------------------------------------------------------------
+  def apply(self, parser):
+    '''
+    Populates `parser` with the raw values of this snapshot and
+    returns it. Raises a `ValueError` if the snapshot does not match
+    `parser` (see :meth:`matches`).
+    '''
+    if not self.matches(parser):
+      raise ValueError(
+        'snapshot of %r does not match the optionxform of %r'
+        % (self.root, parser))
+    parser._im_update_raw(parser, parser.IM_DEFAULTSECT, self.defaults)
+    for section, items in self.sections:
+      if not parser.has_section(section):
+        parser.add_section(section)
+      parser._im_update_raw(parser, section, items)
+    return parser
+
+  #----------------------------------------------------------------------------
+  def dumps(self):
+    return json.dumps(dict(
+      version     = SNAPSHOT_VERSION,
+      root        = self.root,
+      encoding    = self.encoding,
+      defaults    = self.defaults,
+      sections    = self.sections,
+      sources     = self.sources,
+      optionxform = self.optionxform,
+      cacheable   = self.cacheable,
+    ), separators=(',', ':'))
+
+  #----------------------------------------------------------------------------
+  @classmethod
+  def loads(cls, data):
+    if isinstance(data, six.binary_type):
+      data = data.decode('utf-8')
+    data = json.loads(data)
+    if data.get('version') != SNAPSHOT_VERSION:
+      raise ValueError('unsupported snapshot version: %r' % (data.get('version'),))
+    return cls(
+      data['root'], data['encoding'],
+      defaults    = [tuple(item) for item in data['defaults']],
+      sections    = [(sect, [tuple(item) for item in items])
+                     for sect, items in data['sections']],
+      sources     = [tuple(item) for item in data['sources']],
+      optionxform = data['optionxform'],
+      cacheable   = data['cacheable'],
+    )
+
+  #----------------------------------------------------------------------------
+  def save(self, filename):
+    '''
+    Atomically writes this snapshot to the file `filename`.
+    '''
+    _atomic_write(filename, self.dumps().encode('utf-8'))
+
+  #----------------------------------------------------------------------------
+  @classmethod
+  def load(cls, filename):
+    with open(filename, 'rb') as fp:
+      return cls.loads(fp.read())
+
+
+#------------------------------------------------------------------------------
+def compile_snapshot(root, filename=None, encoding=None, parser=None):
+  '''
+  Resolves the INI file `root` (with the optional, empty parser
+  `parser`, see :meth:`Snapshot.compile`) into a :class:`Snapshot`,
+  which is saved to `filename` if specified, and returned.
+  '''
+  ret = Snapshot.compile(root, encoding=encoding, parser=parser)
+  if filename is not None:
+    ret.save(filename)
+  return ret
+
+#------------------------------------------------------------------------------
+def load_snapshot(filename, root=None, parser=None, encoding=None):
+  '''
+  Populates `parser` (which defaults to a new
+  :class:`iniherit.ConfigParser`) from the snapshot stored in
+  `filename` and returns it. If the snapshot does not exist, is
+  invalid, was compiled from a root other than `root` or with a
+  different optionxform, or any of its source files have changed,
+  the inheritance tree is re-resolved from `root` (or the root
+  recorded in the snapshot) with a new parser that is configured just
+  like `parser`, and the snapshot is re-written.
+  '''
+  if parser is None:
+    parser = ConfigParser()
+  try:
+    snap = Snapshot.load(filename)
+  except (IOError, OSError, ValueError, KeyError, TypeError):
+    snap = None
+  if root is not None:
+    root = os.path.abspath(root)
+  if snap is not None \
+      and ( root is None or snap.root == root ) \
+      and ( encoding is None or snap.encoding == encoding ) \
+      and snap.matches(parser) \
+      and snap.isFresh():
+    return snap.apply(parser)
+  if root is None:
+    if snap is None:
+      raise IOError(2, 'No such snapshot', filename)
+    root = snap.root
+    if encoding is None:
+      encoding = snap.encoding
+  snap = Snapshot.compile(root, encoding=encoding, parser=_blankParser(parser))
+  try:
+    snap.save(filename)
+  except (IOError, OSError):
+    pass
+  return snap.apply(parser)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
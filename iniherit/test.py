@@ -7,7 +7,9 @@
 #------------------------------------------------------------------------------
 
 import unittest
-import io
+import os
+import shutil
+import tempfile
 import textwrap
 
 import six
@@ -27,7 +29,51 @@ class ByteLoader(Loader):
     return ret
 
 #------------------------------------------------------------------------------
-class TestIniherit(unittest.TestCase):
+class CountingLoader(Loader):
+  def __init__(self, loader=None):
+    self.loader = loader or Loader()
+    self.loaded = []
+  def load(self, name, encoding=None):
+    self.loaded.append(name)
+    return self.loader.load(name, encoding=encoding)
+
+#------------------------------------------------------------------------------
+def _arun(coroutine):
+  # runs `coroutine` in a new event loop (`asyncio.run` is Python 3.7+)
+  import asyncio
+  loop = asyncio.new_event_loop()
+  try:
+    return loop.run_until_complete(coroutine)
+  finally:
+    loop.close()
+
+#------------------------------------------------------------------------------
+class TempDirMixin(object):
+  '''
+  Provides test cases with a private temporary directory (`tmpdir`),
+  which is created on first use and removed when the test completes.
+  '''
+
+  #----------------------------------------------------------------------------
+  @property
+  def tmpdir(self):
+    if getattr(self, '_tmpdir', None) is None:
+      self._tmpdir = tempfile.mkdtemp()
+      self.addCleanup(shutil.rmtree, self._tmpdir)
+    return self._tmpdir
+
+  #----------------------------------------------------------------------------
+  def write(self, name, data, mtime=None):
+    'Writes `data` to the file `name` in `tmpdir` and returns its path.'
+    path = os.path.join(self.tmpdir, name)
+    with open(path, 'wb' if isinstance(data, six.binary_type) else 'w') as fp:
+      fp.write(data)
+    if mtime is not None:
+      os.utime(path, (mtime, mtime))
+    return path
+
+#------------------------------------------------------------------------------
+class TestIniherit(TempDirMixin, unittest.TestCase):
 
   maxDiff = None
 
@@ -163,14 +209,12 @@ class TestIniherit(unittest.TestCase):
     self.assertEqual(parser.get('DEFAULT', 'code'), 'foo')
     self.assertEqual(parser.get('section', 'value'), 'it-is-bar')
     self.assertEqual(parser.get('section', 'code'), 'bar')
-    # TODO: enable this when "%inherit" interpolation uses iniherit
-    #       interpolation for recursive interpolation...
-    # parser = ConfigParser(loader=ByteLoader(files))
-    # parser.read('base-with-cascading-interpolation.ini')
-    # self.assertEqual(parser.get('DEFAULT', 'value'), 'it-is-foo')
-    # self.assertEqual(parser.get('DEFAULT', 'code'), 'foo')
-    # self.assertEqual(parser.get('section', 'value'), 'it-is-bar')
-    # self.assertEqual(parser.get('section', 'code'), 'bar')
+    parser = ConfigParser(loader=ByteLoader(files))
+    parser.read('base-with-cascading-interpolation.ini')
+    self.assertEqual(parser.get('DEFAULT', 'value'), 'it-is-foo')
+    self.assertEqual(parser.get('DEFAULT', 'code'), 'foo')
+    self.assertEqual(parser.get('section', 'value'), 'it-is-bar')
+    self.assertEqual(parser.get('section', 'code'), 'bar')
 
   #----------------------------------------------------------------------------
   def test_iniherit_nameWithSpace(self):
@@ -195,6 +239,380 @@ class TestIniherit(unittest.TestCase):
     self.assertEqual(sorted(parser.items('s')),
                      sorted(dict(foo='bar', zig='zag', x='z').items()))
 
+  #----------------------------------------------------------------------------
+  def test_iniherit_diamondParsedOnce(self):
+    files = {k: textwrap.dedent(v) for k, v in {
+      'common.ini' : '[DEFAULT]\nkw = common\n[s]\nfoo = common-foo\n[t]\nbar = common-bar\n',
+      'a.ini'      : '[DEFAULT]\n%inherit = common.ini\nkwa = a\n',
+      'b.ini'      : '[DEFAULT]\n%inherit = common.ini\nkwb = b\n',
+      'config.ini' : '[DEFAULT]\n%inherit = a.ini b.ini\n[t]\n%inherit = common.ini\n',
+    }.items()}
+    loader = CountingLoader(ByteLoader(files))
+    parser = ConfigParser(loader=loader)
+    parser.read('config.ini')
+    self.assertEqual(sorted(loader.loaded), ['a.ini', 'b.ini', 'common.ini', 'config.ini'])
+    self.assertEqual(parser.get('s', 'kw'), 'common')
+    self.assertEqual(parser.get('s', 'foo'), 'common-foo')
+    self.assertEqual(parser.get('t', 'bar'), 'common-bar')
+    self.assertEqual(parser.get('DEFAULT', 'kwa'), 'a')
+    self.assertEqual(parser.get('DEFAULT', 'kwb'), 'b')
+
+  #----------------------------------------------------------------------------
+  def test_iniherit_sharedFileCache(self):
+    from iniherit.parser import FileCache
+    self.write('base.ini', '[s]\nkw = base\n')
+    root  = self.write('config.ini', '[DEFAULT]\n%inherit = base.ini ?override.ini\n')
+    cache = FileCache()
+    def read():
+      loader = CountingLoader()
+      parser = ConfigParser(loader=loader, filecache=cache)
+      parser.read(root)
+      return parser, [os.path.basename(name) for name in loader.loaded]
+    parser, loaded = read()
+    self.assertEqual(loaded, ['config.ini', 'base.ini', 'override.ini'])
+    self.assertEqual(parser.get('s', 'kw'), 'base')
+    parser, loaded = read()
+    self.assertEqual(loaded, [])
+    self.assertEqual(parser.get('s', 'kw'), 'base')
+    self.write('base.ini', '[s]\nkw = changed\n')
+    parser, loaded = read()
+    self.assertEqual(loaded, ['config.ini', 'base.ini', 'override.ini'])
+    self.assertEqual(parser.get('s', 'kw'), 'changed')
+    self.write('override.ini', '[s]\nkw = override\n')
+    parser, loaded = read()
+    self.assertEqual(loaded, ['config.ini', 'override.ini'])
+    self.assertEqual(parser.get('s', 'kw'), 'override')
+
+  #----------------------------------------------------------------------------
+  def test_iniherit_processSharedCache(self):
+    from iniherit.parser import \
+      FileCache, enable_shared_cache, disable_shared_cache, clear_shared_cache
+    root = self.write('config.ini', '[s]\nkw = value\n')
+    disable_shared_cache()
+    def read(**kw):
+      loader = CountingLoader()
+      parser = ConfigParser(loader=loader, **kw)
+      parser.read(root)
+      self.assertEqual(parser.get('s', 'kw'), 'value')
+      return len(loader.loaded)
+    self.assertEqual(read(), 1)
+    self.assertEqual(read(), 1)
+    cache = enable_shared_cache()
+    self.addCleanup(disable_shared_cache)
+    self.assertIsInstance(cache, FileCache)
+    self.assertEqual(read(), 1)
+    self.assertEqual(read(), 0)
+    self.assertEqual(read(filecache=False), 1)
+    self.assertEqual(read(filecache=FileCache()), 1)
+    # different loader types do not share entries
+    parser = ConfigParser()
+    parser.read(root)
+    self.assertEqual(len(cache.entries), 2)
+    clear_shared_cache()
+    self.assertEqual(read(), 1)
+    disable_shared_cache()
+    self.assertEqual(read(), 1)
+
+  #----------------------------------------------------------------------------
+  def test_iniherit_diskCache(self):
+    from iniherit.diskcache import DiskCache
+    old = 1000000000
+    self.write('base.ini', '[DEFAULT]\nkw = base\n[s]\nfoo = %(kw)s-foo\n', mtime=old)
+    root  = self.write('config.ini', '[DEFAULT]\n%inherit = base.ini ?x.ini\n[s]\nbar = b\n', mtime=old)
+    cache = DiskCache(os.path.join(self.tmpdir, 'cache'))
+    def read(**kw):
+      loader = CountingLoader()
+      parser = ConfigParser(loader=loader, diskcache=cache, **kw)
+      self.assertEqual(parser.read(root), [root])
+      return parser, [os.path.basename(name) for name in loader.loaded]
+    parser, loaded = read()
+    self.assertEqual(loaded, ['config.ini', 'base.ini', 'x.ini'])
+    self.assertEqual(len(os.listdir(cache.directory)), 1)
+    for lazy in (False, True):
+      parser, loaded = read(lazy=lazy)
+      self.assertEqual(loaded, [])
+      self.assertEqual(parser.items('s'), [
+        ('kw', 'base'), ('foo', 'base-foo'), ('bar', 'b')])
+      self.assertEqual(
+        [os.path.basename(name) for name in parser._im_files],
+        ['config.ini', 'base.ini', 'x.ini'])
+    self.write('x.ini', '[s]\nfoo = %(SUPER)s-x\n', mtime=old)
+    parser, loaded = read()
+    self.assertEqual(loaded, ['config.ini', 'base.ini', 'x.ini'])
+    self.assertEqual(parser.get('s', 'foo'), 'base-foo-x')
+    parser, loaded = read()
+    self.assertEqual(loaded, [])
+    self.assertEqual(parser.get('s', 'foo'), 'base-foo-x')
+    # provenance tracking bypasses the cache
+    parser, loaded = read(track_provenance=True)
+    self.assertEqual(len(loaded), 3)
+    # recently modified files are not cached
+    self.write('x.ini', '[s]\nfoo = new\n')
+    for count in range(2):
+      parser, loaded = read()
+      self.assertEqual(loaded, ['config.ini', 'base.ini', 'x.ini'])
+      self.assertEqual(parser.get('s', 'foo'), 'new')
+    # cached values are not "%(SUPER)s"-substituted again (in any mode)
+    self.write('x.ini', '[DEFAULT]\no = %(SUPER:-x)s+d\n[s]\no = %(SUPER)s+s\n', mtime=old)
+    expected = read()[0].get('s', 'o')
+    for lazy in (False, True):
+      parser, loaded = read(lazy=lazy)
+      self.assertEqual(loaded, [])
+      self.assertEqual(parser.get('s', 'o'), expected)
+      parser = ConfigParser(lazy=lazy)
+      parser.read(root)
+      self.assertEqual(parser.get('s', 'o'), expected)
+    cache.clear()
+    self.assertEqual(os.listdir(cache.directory), [])
+    # the default location is $XDG_CACHE_HOME/iniherit
+    environ = dict(os.environ)
+    self.addCleanup(os.environ.update, environ)
+    os.environ['XDG_CACHE_HOME'] = self.tmpdir
+    self.assertEqual(DiskCache().directory, os.path.join(self.tmpdir, 'iniherit'))
+
+  #----------------------------------------------------------------------------
+  @unittest.skipIf(six.PY2, 'asyncio requires Python 3')
+  def test_aread(self):
+    import asyncio
+    from iniherit.aio import AsyncLoader
+    files = {k: textwrap.dedent(v) for k, v in {
+      'common.ini' : '[DEFAULT]\nkw = common\n[s]\nv = common\n',
+      'a.ini'      : '[DEFAULT]\n%inherit = common.ini\n[s]\nv = %(SUPER)s a\n',
+      'b.ini'      : '[DEFAULT]\n%inherit = common.ini\n[s]\nv = %(SUPER)s b\n',
+      'c.ini'      : '[s]\nc = c\n',
+      'config.ini' : '[DEFAULT]\n%inherit = a.ini ?nope.ini b.ini\n[s]\n%inherit = c.ini\n',
+    }.items()}
+    class SlowLoader(AsyncLoader):
+      active = peak = 0
+      # note: returns a future instead of being an "async def", which
+      #       Python 2 cannot compile.
+      def load(self, name, encoding=None):
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        SlowLoader.active += 1
+        SlowLoader.peak = max(SlowLoader.peak, SlowLoader.active)
+        def done():
+          SlowLoader.active -= 1
+          try:
+            future.set_result(ByteLoader(files).load(name))
+          except IOError as err:
+            future.set_exception(err)
+        loop.call_later(0.01, done)
+        return future
+    parser = ConfigParser()
+    result = _arun(parser.aread(['config.ini', 'nope.ini'], loader=SlowLoader()))
+    self.assertEqual(result, ['config.ini'])
+    self.assertEqual(SlowLoader.peak, 3)
+    expected = ConfigParser(loader=ByteLoader(files))
+    expected.read('config.ini')
+    self.assertEqual(parser.items('s'), expected.items('s'))
+    self.assertEqual(parser.get('s', 'v'), 'common b')
+    parser = ConfigParser(loader=ByteLoader(files))
+    _arun(parser.aread('config.ini'))
+    self.assertEqual(parser.items('s'), expected.items('s'))
+    files['a.ini'] = '[DEFAULT]\n%inherit = nope.ini\n'
+    with self.assertRaises(IOError):
+      _arun(ConfigParser(loader=ByteLoader(files)).aread('config.ini'))
+
+  #----------------------------------------------------------------------------
+  @unittest.skipIf(six.PY2, 'asyncio requires Python 3')
+  def test_aread_caches(self):
+    from iniherit.aio import AsyncLoader
+    from iniherit.diskcache import DiskCache
+    from iniherit.parser import FileCache
+    self.write('base.ini', '[s]\nkw = base\n', mtime=1000000000)
+    root = self.write(
+      'config.ini', '[DEFAULT]\n%inherit = base.ini\n[s]\nv = %(kw)s-v\n',
+      mtime=1000000000)
+    class CountingAsyncLoader(AsyncLoader):
+      loaded = []
+      def load(self, name, encoding=None):
+        self.loaded.append(os.path.basename(name))
+        return AsyncLoader.load(self, name, encoding)
+    def aread(**kw):
+      loader = CountingAsyncLoader()
+      del loader.loaded[:]
+      parser = ConfigParser(**kw)
+      self.assertEqual(_arun(parser.aread(root, loader=loader)), [root])
+      self.assertEqual(parser.get('s', 'v'), 'base-v')
+      return loader.loaded
+    class CountingDiskCache(DiskCache):
+      loads = 0
+      def load(self, *args, **kw):
+        CountingDiskCache.loads += 1
+        return DiskCache.load(self, *args, **kw)
+    disk = CountingDiskCache(os.path.join(self.tmpdir, 'cache'))
+    for cache in (
+        dict(filecache=FileCache()),
+        dict(filecache=False, diskcache=disk),
+      ):
+      self.assertEqual(sorted(aread(**cache)), ['base.ini', 'config.ini'])
+      self.assertEqual(aread(**cache), [])
+    # each entry is only loaded once per read
+    self.assertEqual(CountingDiskCache.loads, 2)
+
+  #----------------------------------------------------------------------------
+  def test_prefetch(self):
+    import threading, time
+    try:
+      import concurrent.futures
+    except ImportError:
+      raise unittest.SkipTest('prefetching requires the "futures" backport')
+    files = {k: textwrap.dedent(v) for k, v in {
+      'common.ini' : '[DEFAULT]\nkw = common\n[s]\nv = common\n',
+      'a.ini'      : '[DEFAULT]\n%inherit = common.ini\n[s]\nv = %(SUPER)s a\n',
+      'b.ini'      : '[DEFAULT]\n%inherit = common.ini\n[s]\nv = %(SUPER)s b\n',
+      'c.ini'      : '[s]\nc = c\n',
+      'config.ini' : '[DEFAULT]\n%inherit = a.ini ?nope.ini b.ini\n[s]\n%inherit = c.ini\n',
+    }.items()}
+    class SlowLoader(ByteLoader):
+      lock = threading.Lock()
+      active = peak = 0
+      def load(self, name, encoding=None):
+        with self.lock:
+          SlowLoader.active += 1
+          SlowLoader.peak = max(SlowLoader.peak, SlowLoader.active)
+        try:
+          time.sleep(0.02)
+          return ByteLoader.load(self, name, encoding)
+        finally:
+          with self.lock:
+            SlowLoader.active -= 1
+    loader = CountingLoader(SlowLoader(files))
+    parser = ConfigParser(loader=loader, prefetch_workers=4)
+    self.assertEqual(parser.read(['config.ini', 'nope.ini']), ['config.ini'])
+    self.assertEqual(
+      sorted(loader.loaded),
+      ['a.ini', 'b.ini', 'c.ini', 'common.ini', 'config.ini', 'nope.ini'])
+    self.assertGreater(SlowLoader.peak, 1)
+    expected = ConfigParser(loader=ByteLoader(files))
+    expected.read('config.ini')
+    self.assertEqual(parser.items('s'), expected.items('s'))
+    self.assertEqual(parser.items('DEFAULT'), expected.items('DEFAULT'))
+    files['a.ini'] = '[DEFAULT]\n%inherit = nope.ini\n'
+    parser = ConfigParser(loader=ByteLoader(files), prefetch_workers=4)
+    with self.assertRaises(IOError):
+      parser.read('config.ini')
+
+  #----------------------------------------------------------------------------
+  def test_snapshot(self):
+    from iniherit import compile_snapshot, load_snapshot
+    self.write('base.ini', '[DEFAULT]\nkw = base\n[s]\nfoo = %(kw)s-foo\nbar = b\n')
+    root = self.write('config.ini', '[DEFAULT]\n%inherit = base.ini\n[s]\nbar = %(SUPER)s-c\n')
+    snapfile = os.path.join(self.tmpdir, 'config.snapshot')
+    snap = compile_snapshot(root, snapfile)
+    self.assertEqual(
+      [os.path.basename(src[0]) for src in snap.sources], ['config.ini', 'base.ini'])
+    def load():
+      loader = CountingLoader()
+      parser = load_snapshot(snapfile, parser=ConfigParser(loader=loader))
+      return parser, loader.loaded
+    parser, loaded = load()
+    self.assertEqual(loaded, [])
+    self.assertEqual(parser.get('s', 'foo'), 'base-foo')
+    self.assertEqual(parser.get('s', 'foo', raw=True), '%(kw)s-foo')
+    self.assertEqual(parser.get('s', 'bar'), 'b-c')
+    # a changed mtime with unchanged content does not invalidate
+    os.utime(os.path.join(self.tmpdir, 'base.ini'), (1, 1))
+    parser, loaded = load()
+    self.assertEqual(loaded, [])
+    self.write('base.ini', '[DEFAULT]\nkw = changed\n[s]\nfoo = %(kw)s-foo\nbar = b\n')
+    parser = load_snapshot(snapfile)
+    self.assertEqual(parser.get('s', 'foo'), 'changed-foo')
+    parser, loaded = load()
+    self.assertEqual(loaded, [])
+    self.assertEqual(parser.get('s', 'foo'), 'changed-foo')
+
+  #----------------------------------------------------------------------------
+  def test_snapshot_optionxform(self):
+    from iniherit import Snapshot, compile_snapshot, load_snapshot
+    root = self.write('config.ini', '[s]\nFooBar = value\n')
+    snapfile = os.path.join(self.tmpdir, 'config.snapshot')
+    snap = compile_snapshot(root, snapfile)
+    class CaseParser(ConfigParser):
+      optionxform = str
+    parser = CaseParser()
+    self.assertFalse(snap.matches(parser))
+    self.assertRaises(ValueError, snap.apply, parser)
+    parser = load_snapshot(snapfile, parser=parser)
+    self.assertEqual(dict(parser.items('s')), {'FooBar': 'value'})
+    snap = Snapshot.load(snapfile)
+    self.assertTrue(snap.matches(CaseParser()))
+    self.assertEqual(snap.sections, [('s', [('FooBar', 'value')])])
+
+  #----------------------------------------------------------------------------
+  def test_snapshot_parserSettings(self):
+    from iniherit import load_snapshot
+    from iniherit.snapshot import _blankParser
+    root = self.write('config.ini', '[s]\nkw = %(base)s-b\n')
+    snapfile = os.path.join(self.tmpdir, 'config.snapshot')
+    parser = ConfigParser(defaults={'base': 'x'}, lazy=True)
+    blank = _blankParser(parser)
+    self.assertIsNot(blank._defaults, parser._defaults)
+    self.assertEqual(blank.defaults(), {'base': 'x'})
+    self.assertTrue(blank.lazy)
+    # the stale snapshot is re-built with the caller's settings
+    parser = load_snapshot(snapfile, root=root, parser=parser)
+    self.assertEqual(parser.get('s', 'kw'), 'x-b')
+    self.assertEqual(parser.defaults(), {'base': 'x'})
+
+  #----------------------------------------------------------------------------
+  def test_snapshot_notCacheable(self):
+    from iniherit import compile_snapshot, load_snapshot
+    self.write('a.ini', '[s]\nkw = a\n')
+    self.write('b.ini', '[s]\nkw = b\n')
+    root = self.write('config.ini', '[DEFAULT]\n%inherit = %(ENV:INIHERIT_TEST_BASE)s.ini\n')
+    self.addCleanup(os.environ.pop, 'INIHERIT_TEST_BASE', None)
+    os.environ['INIHERIT_TEST_BASE'] = 'a'
+    snapfile = os.path.join(self.tmpdir, 'config.snapshot')
+    snap = compile_snapshot(root, snapfile)
+    self.assertFalse(snap.cacheable)
+    self.assertFalse(snap.isFresh())
+    os.environ['INIHERIT_TEST_BASE'] = 'b'
+    self.assertEqual(load_snapshot(snapfile).get('s', 'kw'), 'b')
+
+  #----------------------------------------------------------------------------
+  def test_reloadIfChanged(self):
+    from iniherit.parser import CP
+    self.write('base.ini', '[DEFAULT]\nkw = base\n[s]\nfoo = f\nbar = b\n')
+    root = self.write('config.ini', '[DEFAULT]\n%inherit = base.ini\n[t]\nzig = z\n')
+    parser = ConfigParser(valuecache=True)
+    parser.read(root)
+    changes = []
+    callback = changes.append
+    self.assertIs(parser.watch(callback), callback)
+    self.assertEqual(parser.get('s', 'kw'), 'base')
+    self.assertIsNone(parser.reload_if_changed())
+    self.write('base.ini', '[DEFAULT]\nkw = changed\n[s]\nbar = b\nbaz = new\n')
+    self.assertEqual(
+      [os.path.basename(name) for name in parser.changed_files()], ['base.ini'])
+    result = parser.reload_if_changed()
+    self.assertEqual(changes, [result])
+    self.assertEqual(result.added, [('s', 'baz')])
+    self.assertEqual(result.removed, [('s', 'foo')])
+    self.assertEqual(
+      result.changed, [('DEFAULT', 'kw'), ('s', 'kw'), ('t', 'kw')])
+    self.assertEqual(parser.get('s', 'kw'), 'changed')
+    self.assertEqual(parser.sections(), ['s', 't'])
+    self.assertIsNone(parser.reload_if_changed())
+    # a failed reload keeps the previous values
+    self.write('base.ini', '[s]\nnovalue\n')
+    with self.assertRaises(CP.ParsingError):
+      parser.reload_if_changed()
+    self.assertEqual(parser.get('s', 'baz'), 'new')
+    self.assertEqual(len(changes), 1)
+
+  #----------------------------------------------------------------------------
+  def test_iniherit_sectionOverridesDefaultWithSameValue(self):
+    files = {k: textwrap.dedent(v) for k, v in {
+      'base.ini'   : '[DEFAULT]\nkw = same\n[s]\nkw = same\n',
+      'config.ini' : '[DEFAULT]\n%inherit = base.ini\nkw = other\n',
+    }.items()}
+    parser = ConfigParser(loader=ByteLoader(files))
+    parser.read('config.ini')
+    self.assertEqual(parser.get('DEFAULT', 'kw'), 'other')
+    self.assertEqual(parser.get('s', 'kw'), 'same')
+
   #----------------------------------------------------------------------------
   def test_iniherit_interpolation(self):
     files = {k: textwrap.dedent(v) for k, v in {
@@ -453,6 +871,27 @@ class TestIniherit(unittest.TestCase):
       )
     self.assertMultiLineEqual(str(cm.exception), err)
 
+  #----------------------------------------------------------------------------
+  def test_interpolation_tokenize(self):
+    from iniherit import interpolation as I
+    self.assertEqual(
+      I.tokenize('a %(ENV:X:-d)s b %(SUPER)s %(ref)s %(SUPER:-s)s%(ENV:Y)s'),
+      (
+        (I.TOKEN_LITERAL,   'a ',               None,    None),
+        (I.TOKEN_ENV,       '%(ENV:X:-d)s',     'X',     'd'),
+        (I.TOKEN_LITERAL,   ' b ',              None,    None),
+        (I.TOKEN_SUPER,     '%(SUPER)s',        'SUPER', None),
+        (I.TOKEN_LITERAL,   ' ',                None,    None),
+        (I.TOKEN_REFERENCE, '%(ref)s',          'ref',   None),
+        (I.TOKEN_LITERAL,   ' ',                None,    None),
+        (I.TOKEN_SUPER,     '%(SUPER:-s)s',     'SUPER', 's'),
+        (I.TOKEN_ENV,       '%(ENV:Y)s',        'Y',     None),
+      ))
+    self.assertEqual(I.tokenize('no references'),
+                     ((I.TOKEN_LITERAL, 'no references', None, None),))
+    self.assertEqual(I.substitute_super('%(SUPER)s, b', 'a'), 'a, b')
+    self.assertEqual(I.substitute_super('%(SUPER)s, b', None), '%(SUPER)s, b')
+
   #----------------------------------------------------------------------------
   def test_cascading_env_interpolate(self):
     # test that if a key contains an interpolation of another key
@@ -469,6 +908,426 @@ class TestIniherit(unittest.TestCase):
     self.assertEqual(parser.get('DEFAULT', 'kw2'), 'defval')
     self.assertEqual(parser.get('DEFAULT', 'kw1'), 'defval')
 
+  #----------------------------------------------------------------------------
+  def test_interpolation_referenceGraph(self):
+    from six.moves.configparser import InterpolationDepthError
+    from iniherit import InterpolationMissingEnvError
+    files = {k: textwrap.dedent(v) for k, v in {
+      'config.ini' : '''
+        [DEFAULT]
+        kw1 = %(kw2)s/%(kw3)s
+        kw2 = %(kw3)s
+        kw3 = %(ENV:INIHERIT_TEST_NOEXIST:-defval)s
+        unused = %(ENV:INIHERIT_TEST_NOEXIST)s
+        cycle1 = %(cycle2)s
+        cycle2 = x %(cycle1)s
+      ''',
+    }.items()}
+    parser = ConfigParser(loader=ByteLoader(files))
+    parser.read('config.ini')
+    self.assertEqual(parser.get('DEFAULT', 'kw1'), 'defval/defval')
+    with self.assertRaises(InterpolationMissingEnvError):
+      parser.get('DEFAULT', 'unused')
+    with self.assertRaises(InterpolationDepthError):
+      parser.get('DEFAULT', 'cycle1')
+
+  #----------------------------------------------------------------------------
+  def test_interpolation_nestedDefaults(self):
+    files = {'config.ini': textwrap.dedent('''\
+      [s]
+      env   = %(ENV:INIHERIT_TEST_NOEXIST:-%(ENV:INIHERIT_TEST_NESTED)s)s
+      super = %(SUPER:-%(ENV:INIHERIT_TEST_NESTED)s)s
+      deep  = %(ENV:INIHERIT_TEST_NOEXIST:-%(ENV:INIHERIT_TEST_NOEXIST2:-deep)s)s
+      ''')}
+    os.environ['INIHERIT_TEST_NESTED'] = 'nested'
+    self.addCleanup(os.environ.pop, 'INIHERIT_TEST_NESTED', None)
+    parser = ConfigParser(loader=ByteLoader(files))
+    parser.read('config.ini')
+    self.assertEqual(parser.get('s', 'env'), 'nested')
+    self.assertEqual(parser.get('s', 'super'), 'nested')
+    self.assertEqual(parser.get('s', 'deep'), 'deep')
+
+  #----------------------------------------------------------------------------
+  def test_interpolation_escapedReferences(self):
+    from iniherit import interpolation as I
+    self.assertEqual(
+      I.tokenize('%%(b)s %(c)s'), (
+        (I.TOKEN_LITERAL,   '%%(b)s ', None, None),
+        (I.TOKEN_REFERENCE, '%(c)s',   'c',  None),
+      ))
+    if six.PY2:
+      # note: Python 2's ConfigParser interpolation re-interpolates the
+      #       result of "%%" escapes until there are no "%(" left.
+      return
+    for data, expected in (
+        ('[s]\na = %%(b)s\nb = %(SUPER)s\n', '%(b)s'),
+        ('[s]\na = %(b)s\nb = %%(a)s\n', '%(a)s'),
+        ('[s]\na = %%(ENV:INIHERIT_TEST_NOEXIST)s\n', '%(ENV:INIHERIT_TEST_NOEXIST)s'),
+      ):
+      parser = ConfigParser(loader=ByteLoader({'config.ini': data}))
+      parser.read('config.ini')
+      self.assertEqual(parser.get('s', 'a'), expected)
+
+  #----------------------------------------------------------------------------
+  def test_valuecache(self):
+    import os
+    files = {k: textwrap.dedent(v) for k, v in {
+      'config.ini' : '''
+        [DEFAULT]
+        kw1 = %(kw2)s
+        kw2 = %(ENV:INIHERIT_TEST_CACHED:-defval)s
+        [section]
+        kw3 = %(kw1)s
+      ''',
+    }.items()}
+    os.environ.pop('INIHERIT_TEST_CACHED', None)
+    parser = ConfigParser(loader=ByteLoader(files), valuecache=True)
+    parser.read('config.ini')
+    self.assertEqual(parser.get('section', 'kw3'), 'defval')
+    os.environ['INIHERIT_TEST_CACHED'] = 'envval'
+    self.addCleanup(os.environ.pop, 'INIHERIT_TEST_CACHED', None)
+    self.assertEqual(parser.get('section', 'kw3'), 'defval')
+    self.assertEqual(parser.get('section', 'kw3', vars={'kw1': 'v'}), 'v')
+    parser.clear_cache()
+    self.assertEqual(parser.get('section', 'kw3'), 'envval')
+    parser.set('DEFAULT', 'kw2', 'setval')
+    self.assertEqual(parser.get('section', 'kw3'), 'setval')
+    parser.remove_option('section', 'kw3')
+    self.assertFalse(parser.has_option('section', 'kw3'))
+    self.assertEqual(parser.get('section', 'kw1'), 'setval')
+    parser.remove_section('section')
+    with self.assertRaises(Exception):
+      parser.get('section', 'kw1')
+
+  #----------------------------------------------------------------------------
+  def test_freeze(self):
+    import os, pickle
+    from six.moves.configparser import NoOptionError, NoSectionError
+    from iniherit import freeze, InterpolationMissingEnvError
+    files = {k: textwrap.dedent(v) for k, v in {
+      'base.ini' : '''
+        [DEFAULT]
+        root = /base
+        path = %(root)s/path
+        [app]
+        Debug = true
+        workers = 4
+        ratio = 0.5
+      ''',
+      'config.ini' : '''
+        [DEFAULT]
+        %inherit = base.ini
+        [app]
+        root = /app
+        missing = %(ENV:INIHERIT_TEST_NOEXIST)s
+        [other]
+        name = other
+      ''',
+    }.items()}
+    os.environ.pop('INIHERIT_TEST_NOEXIST', None)
+    parser = ConfigParser(loader=ByteLoader(files))
+    parser.read('config.ini')
+    for cfg in (freeze(parser), pickle.loads(pickle.dumps(freeze(parser)))):
+      # note: the order of sections and options is only preserved on
+      #       Python 3.7+.
+      self.assertEqual(sorted(cfg.sections()), ['app', 'other'])
+      self.assertEqual(cfg.get('app', 'path'), '/app/path')
+      self.assertEqual(cfg.get('other', 'path'), '/base/path')
+      self.assertEqual(cfg.get('DEFAULT', 'path'), '/base/path')
+      self.assertEqual(cfg.getint('app', 'WORKERS'), 4)
+      self.assertEqual(cfg.getfloat('app', 'ratio'), 0.5)
+      self.assertTrue(cfg.getboolean('app', 'debug'))
+      self.assertEqual(cfg.get('other', 'nope', fallback='fb'), 'fb')
+      self.assertEqual(sorted(cfg.items('other')), sorted(parser.items('other')))
+      self.assertTrue(cfg.has_option('other', 'root'))
+      self.assertFalse(cfg.has_option('other', 'debug'))
+      with self.assertRaises(InterpolationMissingEnvError):
+        cfg.get('app', 'missing')
+      with self.assertRaises(NoOptionError):
+        cfg.get('other', 'nope')
+      with self.assertRaises(NoSectionError):
+        cfg.get('nope', 'nope')
+      with self.assertRaises(TypeError):
+        cfg._defaults = {}
+
+  #----------------------------------------------------------------------------
+  def test_freeze_optionxform(self):
+    import pickle
+    from iniherit import freeze
+    files = {'config.ini': '[DEFAULT]\nRoot = /r\n[s]\nKey = %(Root)s/k\n'}
+    class UpperParser(ConfigParser):
+      def optionxform(self, option):
+        return option.strip().upper()
+    for xform, lookup, miss in (
+        (str, 'Key', 'key'),
+        (lambda option: option.upper(), 'key', None),
+        (None, ' key ', None),
+      ):
+      parser = ConfigParser(loader=ByteLoader(files)) if xform else \
+        UpperParser(loader=ByteLoader(files))
+      if xform:
+        parser.optionxform = xform
+      parser.read('config.ini')
+      cfg = freeze(parser)
+      if xform is str:
+        cfg = pickle.loads(pickle.dumps(cfg))
+      self.assertEqual(cfg.get('s', lookup), '/r/k')
+      self.assertTrue(cfg.has_option('s', lookup))
+      if miss is not None:
+        self.assertFalse(cfg.has_option('s', miss))
+      self.assertIsNot(getattr(cfg._xform, '__self__', None), parser)
+
+  #----------------------------------------------------------------------------
+  def test_lazy(self):
+    from six.moves.configparser import NoSectionError
+    files = {k: textwrap.dedent(v) for k, v in {
+      'base.ini' : '''
+        [DEFAULT]
+        path = /base
+        [app]
+        path = %(SUPER)s/app
+        opts = a
+        [tmpl]
+        opts = t
+      ''',
+      'config.ini' : '''
+        [DEFAULT]
+        %inherit = base.ini
+        path = %(SUPER)s/config
+        [app]
+        opts = %(SUPER)s b
+        [svc]
+        %inherit = base.ini[tmpl]
+        opts = %(SUPER)s s
+        [other]
+        x = 1
+      ''',
+    }.items()}
+    eager = ConfigParser(loader=ByteLoader(files))
+    eager.read('config.ini')
+    parser = ConfigParser(loader=ByteLoader(files), lazy=True)
+    parser.read('config.ini')
+    self.assertEqual(parser.sections(), eager.sections())
+    self.assertTrue(parser.has_section('svc'))
+    self.assertEqual(sorted(parser._sections.pending), ['app', 'other', 'svc', 'tmpl'])
+    self.assertEqual(parser.get('app', 'path'), '/base/app')
+    self.assertEqual(parser.get('app', 'opts'), 'a b')
+    self.assertEqual(parser.get('svc', 'opts'), 't s')
+    self.assertEqual(sorted(parser._sections.pending), ['other', 'tmpl'])
+    for section in eager.sections():
+      self.assertEqual(parser.items(section), eager.items(section))
+    parser.remove_section('other')
+    self.assertFalse(parser.has_section('other'))
+    self.assertRaises(NoSectionError, parser.get, 'other', 'x')
+    files['bad.ini'] = '[svc]\n%inherit = base.ini[nope]\n'
+    parser = ConfigParser(loader=ByteLoader(files), lazy=True)
+    self.assertRaises(NoSectionError, parser.read, 'bad.ini')
+
+  #----------------------------------------------------------------------------
+  def test_lazy_concurrentAccess(self):
+    import threading, time
+    files = {
+      'base.ini'   : '[app]\na = 1\nb = 2\n',
+      'config.ini' : '[DEFAULT]\n%inherit = base.ini\n[app]\nb = %(SUPER)s+3\n',
+    }
+    parser = ConfigParser(loader=ByteLoader(files), lazy=True)
+    parser.read('config.ini')
+    # slow down the first-access merge so that the readers overlap it
+    for raw, defaults in parser._sections.pending['app']:
+      section = raw.section
+      raw.section = lambda name, section=section: time.sleep(0.05) or section(name)
+    results = []
+    def reader():
+      results.append(parser.items('app'))
+    threads = [threading.Thread(target=reader) for idx in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(results, [[('a', '1'), ('b', '2+3')]] * 4)
+
+  #----------------------------------------------------------------------------
+  def test_provenance(self):
+    files = {k: textwrap.dedent(v) for k, v in {
+      'base.ini' : '''
+        [DEFAULT]
+        path = /base
+        [app]
+        path = %(SUPER)s/app
+        ; comment
+        Opts = a
+          continued
+      ''',
+      'config.ini' : '''
+        [DEFAULT]
+        %inherit = base.ini
+        [app]
+        opts = %(SUPER)s b
+        [svc]
+        %inherit = base.ini[app]
+        path = /svc
+      ''',
+    }.items()}
+    from six.moves.configparser import NoSectionError
+    self.assertRaises(ValueError, ConfigParser, lazy=True, track_provenance=True)
+    parser = ConfigParser(loader=ByteLoader(files), track_provenance=True)
+    parser.read('config.ini')
+    base = os.path.abspath('base.ini')
+    config = os.path.abspath('config.ini')
+    self.assertEqual(parser.provenance('app', 'OPTS'), [
+      (config, 5, '%(SUPER)s b'),
+      (base, 7, 'a\ncontinued'),
+    ])
+    self.assertEqual(parser.provenance('app', 'path'), [
+      (base, 5, '%(SUPER)s/app'),
+      (base, 3, '/base'),
+    ])
+    self.assertEqual(parser.provenance('svc', 'opts'), [(base, 7, 'a\ncontinued')])
+    self.assertEqual(parser.provenance('svc', 'path'), [(config, 8, '/svc')])
+    self.assertEqual(parser.provenance('svc', 'PATH'), [(config, 8, '/svc')])
+    self.assertEqual(parser.provenance('DEFAULT', 'path'), [(base, 3, '/base')])
+    self.assertRaises(NoSectionError, parser.provenance, 'other', 'path')
+    self.assertEqual(parser.provenance('app', 'nope'), [])
+    self.assertEqual(ConfigParser().provenance('DEFAULT', 'path'), [])
+    # headers with a "]" in them are split just as the parser splits them
+    parser = ConfigParser(
+      loader=ByteLoader({'x.ini': '[a]b]\nkey = v\n'}), track_provenance=True)
+    parser.read('x.ini')
+    self.assertEqual(
+      parser.provenance(parser.sections()[0], 'key'),
+      [(os.path.abspath('x.ini'), 2, 'v')])
+
+  #----------------------------------------------------------------------------
+  def test_sharedConfig(self):
+    import threading
+    from iniherit.shared import SharedConfig
+    files = {
+      'base.ini'   : '[app]\nversion = 1\ncheck = %(version)s\n',
+      'config.ini' : '[DEFAULT]\n%inherit = base.ini\n',
+    }
+    loader = ByteLoader(files)
+    errors = []
+    config = SharedConfig('config.ini', loader=loader, onerror=errors.append)
+    self.assertEqual(config.get('app', 'version'), '1')
+    self.assertEqual(
+      [os.path.basename(name) for name in config.files],
+      ['config.ini', 'base.ini'])
+    stop = threading.Event()
+    mismatches = []
+    def reader():
+      while not stop.is_set():
+        snapshot = config.config
+        if snapshot.get('app', 'version') != snapshot.get('app', 'check'):
+          mismatches.append(snapshot)
+    threads = [threading.Thread(target=reader) for idx in range(4)]
+    for thread in threads:
+      thread.start()
+    try:
+      for idx in range(2, 20):
+        loader.items['base.ini'] = \
+          '[app]\nversion = %d\ncheck = %%(version)s\n' % (idx,)
+        if idx % 2:
+          config.reload()
+        else:
+          config.reload(background=True).join()
+    finally:
+      stop.set()
+      for thread in threads:
+        thread.join()
+    self.assertEqual(mismatches, [])
+    self.assertEqual(config.getint('app', 'version'), 19)
+    loader.items['base.ini'] = '[app]\nnovalue\n'
+    config.reload(background=True).join()
+    self.assertEqual(len(errors), 1)
+    self.assertIs(config.error, errors[0])
+    self.assertEqual(config.getint('app', 'version'), 19)
+    self.assertRaises(Exception, config.reload)
+
+  #----------------------------------------------------------------------------
+  def test_mmapLoader(self):
+    from iniherit.parser import MmapLoader
+    self.write('empty.ini', b'')
+    self.write('base.ini', u'[DEFAULT]\r\n%inherit = empty.ini\r\n[app]\r\nname = gr\u00fc\u00dfe\r\n'.encode('utf-8'))
+    root = self.write('config.ini', b'[DEFAULT]\n%inherit = base.ini\n[app]\nmulti = a\n  b\n')
+    parser = ConfigParser(loader=MmapLoader())
+    parser.read(root, encoding='utf-8')
+    self.assertEqual(parser.get('app', 'name'), u'gr\u00fc\u00dfe')
+    self.assertEqual(parser.get('app', 'multi'), 'a\nb')
+    fp = MmapLoader().load(root, encoding='utf-8')
+    self.assertEqual(fp.name, root)
+    self.assertEqual(fp.read(), '[DEFAULT]\n%inherit = base.ini\n[app]\nmulti = a\n  b\n')
+
+  #----------------------------------------------------------------------------
+  def test_loaderClosed(self):
+    closed = []
+    class ClosingLoader(ByteLoader):
+      def load(self, name, encoding=None):
+        ret = ByteLoader.load(self, name, encoding)
+        ret.close = lambda: closed.append(name)
+        return ret
+    files = {
+      'base.ini'   : '[app]\nfoo = 1\n',
+      'config.ini' : '[DEFAULT]\n%inherit = base.ini\n',
+    }
+    parser = ConfigParser(loader=ClosingLoader(files))
+    parser.read('config.ini')
+    self.assertEqual(sorted(closed), ['base.ini', 'config.ini'])
+
+  #----------------------------------------------------------------------------
+  def test_hook(self):
+    from iniherit.instrument import Collector
+    files = {k: textwrap.dedent(v) for k, v in {
+      'base.ini'   : '[DEFAULT]\nroot = /base\n[app]\nfoo = 1\n',
+      'config.ini' : '''
+        [DEFAULT]
+        %inherit = base.ini
+        [svc]
+        %inherit = base.ini[app]
+        path = %(dir)s/svc
+        dir = %(root)s/lib
+      ''',
+    }.items()}
+    events = []
+    collector = Collector()
+    def hook(event, name, duration, **info):
+      self.assertGreaterEqual(duration, 0)
+      events.append((event, name, info))
+      collector(event, name, duration, **info)
+    parser = ConfigParser(loader=ByteLoader(files), hook=hook)
+    parser.read('config.ini')
+    self.assertEqual(parser.get('svc', 'path'), '/base/lib/svc')
+    self.assertEqual(events, [
+      ('load', 'config.ini', dict(size=len(files['config.ini']))),
+      ('parse', 'config.ini', dict(sections=1, inherits=2)),
+      ('load', 'base.ini', dict(size=len(files['base.ini']))),
+      ('parse', 'base.ini', dict(sections=1, inherits=0)),
+      ('merge', 'base.ini', dict()),
+      ('merge', 'base.ini', dict()),
+      ('merge', 'base.ini', dict(section='svc')),
+      ('merge', 'config.ini', dict()),
+      ('merge', 'config.ini', dict()),
+      ('interpolate', 'svc', dict(option='path', references=2, depth=2)),
+    ])
+    self.assertEqual(collector.phases['merge'][0], 5)
+    self.assertEqual(
+      sorted(collector.files['base.ini']), ['load', 'merge', 'parse'])
+    self.assertIn('interpolate', collector.summary())
+
+  #----------------------------------------------------------------------------
+  def test_updateRaw(self):
+    from iniherit.parser import CP
+    parser = SafeConfigParser()
+    parser.add_section('section')
+    parser._im_update_raw(
+      parser, 'section', [('Key', '%(SUPER)s'), ('other', '100%')])
+    parser._im_update_raw(parser, 'DEFAULT', {'root': '/base'})
+    parser._im_setraw(parser, 'section', 'key', 'overridden')
+    self.assertEqual(
+      parser.items('section', raw=True),
+      [('root', '/base'), ('key', 'overridden'), ('other', '100%')])
+    self.assertRaises(
+      CP.NoSectionError, parser._im_update_raw, parser, 'nosuch', {})
+
   #----------------------------------------------------------------------------
   def test_subclass_override(self):
     # test that subclasses that override `ConfigParser._interpolate`,
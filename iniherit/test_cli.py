@@ -6,13 +6,19 @@
 # copy: (C) Copyright 2014-EOT Cadit Inc., All Rights Reserved.
 #------------------------------------------------------------------------------
 
+import os
+import ast
+import json
+import threading
 import unittest
 import six
 
-from .cli import flatten
+from .cli import flatten, Flattener, main, parseTarget, getFilestats, getFileSignatures
+from .test import CountingLoader, TempDirMixin
+from . import watch
 
 #------------------------------------------------------------------------------
-class TestIniheritCli(unittest.TestCase):
+class TestIniheritCli(TempDirMixin, unittest.TestCase):
 
   #----------------------------------------------------------------------------
   def test_optionKeyCaseStaysConstant(self):
@@ -28,6 +34,183 @@ someURL = http://example.com/PATH
 
     self.assertMultiLineEqual(out, src)
 
+  #----------------------------------------------------------------------------
+  def test_formats(self):
+    src = '''\
+[DEFAULT]
+base = 1
+[app]
+some-URL = http://example.com/%%20
+multi = a
+  b
+ref = %(base)s/x
+env = %(ENV:INIHERIT_TEST_FORMAT)s
+'''
+    os.environ['INIHERIT_TEST_FORMAT'] = 'envval'
+    self.addCleanup(os.environ.pop, 'INIHERIT_TEST_FORMAT', None)
+    def render(format):
+      buf = six.StringIO()
+      flatten(six.StringIO(src), buf, format=format)
+      return buf.getvalue()
+    self.assertMultiLineEqual(render('ini'), '''\
+[DEFAULT]
+base = 1
+
+[app]
+some-URL = http://example.com/%%20
+multi = a
+\tb
+ref = %(base)s/x
+env = %(ENV:INIHERIT_TEST_FORMAT)s
+
+''')
+    # note: PY2's ConfigParser only un-escapes "%%" in values that
+    #       contain a "%(" reference.
+    url = 'http://example.com/%20' if six.PY3 else 'http://example.com/%%20'
+    expected = {
+      'DEFAULT': {'base': '1'},
+      'app': {
+        'base': '1', 'some-URL': url, 'multi': 'a\nb',
+        'ref': '1/x', 'env': 'envval'}}
+    self.assertEqual(json.loads(render('json')), expected)
+    self.assertEqual(ast.literal_eval(render('python')), expected)
+    self.assertMultiLineEqual(render('env'), '''\
+DEFAULT_BASE=1
+APP_BASE=1
+APP_SOME_URL=%s
+APP_MULTI='a
+b'
+APP_REF=1/x
+APP_ENV=envval
+''' % (url,))
+    src = '[a-b]\nc = 1\n[a]\nb-c = 2\n'
+    with self.assertRaises(ValueError) as cm:
+      render('env')
+    self.assertIn("'A_B_C'", str(cm.exception))
+
+  #----------------------------------------------------------------------------
+  def test_explain(self):
+    buf = six.StringIO()
+    flatten(six.StringIO('[app]\nfoo = 1\n'), buf, explain=True)
+    self.assertMultiLineEqual(buf.getvalue(), '''\
+[app]
+# <???>:2: foo = 1
+foo = 1
+
+''')
+
+  #----------------------------------------------------------------------------
+  def test_incrementalFlatten(self):
+    base  = self.write('base.ini', '[app]\nfoo = 1\nbar = 1\n')
+    left  = self.write('left.ini', '[DEFAULT]\n%inherit = base.ini\n[app]\nbar = 2\n')
+    right = self.write('right.ini', '[app]\nzig = 3\n')
+    root  = self.write('root.ini', '[DEFAULT]\n%inherit = left.ini right.ini\n')
+    output = os.path.join(self.tmpdir, 'output.ini')
+    loader = CountingLoader()
+    flattener = Flattener(root, output, loader)
+    self.assertTrue(flattener.flatten())
+    self.assertEqual(len(loader.loaded), 4)
+    self.assertEqual(flattener.files, set([base, left, right, root]))
+    with open(output) as fp:
+      self.assertEqual(fp.read(), '[app]\nfoo = 1\nbar = 2\nzig = 3\n\n')
+    # only the changed file is re-parsed
+    self.write('base.ini', '[app]\nfoo = 4\nbar = 1\n')
+    loader.loaded[:] = []
+    self.assertTrue(flattener.flatten([base]))
+    self.assertEqual(loader.loaded, [base])
+    with open(output) as fp:
+      self.assertEqual(fp.read(), '[app]\nfoo = 4\nbar = 2\nzig = 3\n\n')
+    # the output is not re-written if the result is the same
+    self.write('right.ini', '[app]\nzig = 3\n\n')
+    self.assertFalse(flattener.flatten([right]))
+
+  #----------------------------------------------------------------------------
+  def test_batch(self):
+    self.assertEqual(parseTarget('a.ini:b.ini'), ('a.ini', 'b.ini'))
+    self.assertEqual(parseTarget('C:\\a.ini:b.ini'), ('C:\\a.ini', 'b.ini'))
+    self.assertRaises(ValueError, parseTarget, 'a.ini')
+    def read(name):
+      with open(os.path.join(self.tmpdir, name)) as fp:
+        return fp.read()
+    self.write('base.ini', '[app]\nfoo = 1\n')
+    for env in ('dev', 'prod', 'test'):
+      self.write(env + '.ini', '[DEFAULT]\n%inherit = base.ini\n[app]\nenv = ' + env + '\n')
+    manifest = self.write('manifest.txt', '# comment\n\ntest.ini out-test.ini\n')
+    for jobs in ('1', '2'):
+      self.assertEqual(main([
+        '-j', jobs,
+        '-b', os.path.join(self.tmpdir, 'dev.ini') + ':' + os.path.join(self.tmpdir, 'out-dev.ini'),
+        '-b', os.path.join(self.tmpdir, 'prod.ini') + ':' + os.path.join(self.tmpdir, 'out-prod.ini'),
+        '-m', manifest]), 0)
+      for env in ('dev', 'prod', 'test'):
+        self.assertEqual(
+          read('out-' + env + '.ini'), '[app]\nfoo = 1\nenv = ' + env + '\n\n')
+        os.unlink(os.path.join(self.tmpdir, 'out-' + env + '.ini'))
+
+  #----------------------------------------------------------------------------
+  def test_changeDetector(self):
+    name = self.write('file.ini', '[app]\nfoo = 1\n')
+    stat = os.stat(name)
+    detector = watch.ChangeDetector([name])
+    self.assertEqual(detector.changes(), set())
+    # same-size edit within the mtime granularity is detected
+    with open(name, 'w') as fp:
+      fp.write('[app]\nfoo = 2\n')
+    os.utime(name, (stat.st_atime, stat.st_mtime))
+    self.assertEqual(detector.changes(), set([name]))
+    # metadata-only changes are not
+    os.utime(name, (stat.st_atime + 10, stat.st_mtime + 10))
+    self.assertEqual(detector.changes(), set())
+    os.unlink(name)
+    self.assertEqual(detector.changes(), set([name]))
+    # an existing identical output file is not re-written
+    output = self.write('output.ini', '[app]\nfoo = 1\n\n')
+    self.assertFalse(Flattener(six.StringIO('[app]\nfoo = 1\n'), output).flatten())
+    self.assertTrue(Flattener(six.StringIO('[app]\nfoo = 3\n'), output).flatten())
+    # the legacy mtime-only stats are still available
+    missing = os.path.join(self.tmpdir, 'missing.ini')
+    self.assertEqual(
+      getFilestats([output, missing]), {output: os.stat(output).st_mtime, missing: None})
+    self.assertEqual(
+      getFileSignatures([output, missing]),
+      {output: watch.signature(output), missing: None})
+
+  #----------------------------------------------------------------------------
+  def assertWatcherDetects(self, watcher):
+    try:
+      base  = self.write('base.ini', '[app]\nfoo = 1\n')
+      other = self.write('other.ini', '[app]\nfoo = 1\n')
+      opt   = os.path.join(self.tmpdir, 'optional.ini')
+      # touching an old file does not report it
+      same  = self.write('same.ini', '[app]\nfoo = 1\n', mtime=1000000000)
+      watcher.update([base, opt, same])
+      self.assertEqual(watcher.wait(timeout=0.05), set())
+      def touch():
+        with open(other, 'w') as fp:
+          fp.write('[app]\nfoo = 2\n')
+        os.utime(same, None)
+        with open(base, 'w') as fp:
+          fp.write('[app]\nfoo = 2\n')
+      threading.Timer(0.05, touch).start()
+      self.assertEqual(watcher.wait(timeout=5), set([base]))
+      # a previously missing optional inherit is picked up on creation
+      threading.Timer(0.05, lambda: open(opt, 'w').close()).start()
+      self.assertEqual(watcher.wait(timeout=5), set([opt]))
+    finally:
+      watcher.close()
+
+  #----------------------------------------------------------------------------
+  def test_watch_poll(self):
+    self.assertWatcherDetects(watch.PollingWatcher(interval=0.01, debounce=0.05))
+
+  #----------------------------------------------------------------------------
+  def test_watch_inotify(self):
+    try:
+      watcher = watch.InotifyWatcher(debounce=0.05)
+    except OSError:
+      raise unittest.SkipTest('inotify is not available')
+    self.assertWatcherDetects(watcher)
+
 #------------------------------------------------------------------------------
 # end of $Id$
 #------------------------------------------------------------------------------
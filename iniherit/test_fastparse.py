@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+import re
+import unittest
+import textwrap
+
+import six
+from six.moves import configparser as CP
+
+from . import fastparse
+from .parser import ConfigParser
+from .test import ByteLoader
+
+#------------------------------------------------------------------------------
+# a corpus of INI files, each flagged with whether the fast parser is
+# expected to handle it (vs. falling back to the stdlib parser).
+CORPUS = [
+  (True, ''),
+  (True, '[section]\n'),
+  (True, '[section]\nkey = value\n'),
+  (True, '[section]\nKey=value\nother:value2\n  \n'),
+  (True, '[DEFAULT]\na = 1\n[s1]\nb = 2\n[s2]\nc = %(a)s\n'),
+  (True, '[s]\nkey = \nempty =\n'),
+  (True, '[s]\nkey = a = b : c\nurl: http://example.com:80/\n'),
+  (True, '[s]\nmulti = line 1\n  line 2\n\tline 3\n'),
+  (True, '[s]\nmulti = line 1\n\n  line 3\n\n\n[t]\n'),
+  (True, '[s]\nmulti = line 1\n  # comment\n  line 2\nnext = x\n'),
+  (True, '# comment\n; comment\n[s]\n  ; indented comment\nkey = value # not a comment\n'),
+  (True, '[s]\nkey = value ; not a comment on py3\n'),
+  (True, '  [s]\n  key = value\n    more\n  other = 2\n'),
+  (True, '[s]\nkey = value   \t\n[t]  \nx=1\r\n'),
+  (True, '[a]b]\nx = 1\n[c] = [d]\ny = 2\n'),
+  (True, '[s]\nrem = not a comment\nREM x = y\n'),
+  (True, '[s]\n%inherit = base.ini ?other.ini\nkey = %(SUPER)s\n'),
+  (True, u'[sé]\nkéy = välue\n'),
+  (True, '[DEFAULT]\na = 1\n[s]\nb = 2\n[DEFAULT]\nc = 3\n'),
+  (False, 'key = value\n'),
+  (False, '[s]\n= value\n'),
+  (False, '[s]\nnovalue\n'),
+  # note: PY2's parser allows duplicate sections and options.
+  (six.PY2, '[s]\nkey = 1\nkey = 2\n'),
+  (six.PY2, '[s]\nkey = 1\n[s]\nother = 2\n'),
+  (False, '[]\nkey = 1\n'),
+  (False, '[s\nkey = 1\n'),
+  (False, '[s]\n[key = 1\n'),
+]
+
+#------------------------------------------------------------------------------
+def _stdlib(text):
+  parser = CP.RawConfigParser()
+  try:
+    parser.readfp(six.StringIO(text))
+  except CP.Error as err:
+    return err
+  return (
+    list(parser._defaults.items()),
+    [(name, list(options.items())) for name, options in parser._sections.items()])
+
+#------------------------------------------------------------------------------
+class TestFastparse(unittest.TestCase):
+
+  maxDiff = None
+
+  #----------------------------------------------------------------------------
+  def test_corpus(self):
+    for fast, text in CORPUS:
+      expected = _stdlib(text)
+      result = fastparse.scan(text)
+      if isinstance(expected, Exception):
+        self.assertIsNone(result, 'stdlib fails on %r' % (text,))
+        continue
+      if not fast:
+        self.assertIsNone(result, text)
+        continue
+      self.assertIsNotNone(result, text)
+      self.assertEqual(
+        (list(result[0].items()),
+         [(name, list(options.items())) for name, options in result[1].items()]),
+        expected, text)
+
+  #----------------------------------------------------------------------------
+  def test_sectionHeaders(self):
+    # "]" within section names follows the parser's SECTCRE
+    text = '[a]b]\nx = 1\n'
+    for sectcre, name in (
+        (re.compile(r'\[(?P<header>[^]]+)\]'), 'a'),
+        (re.compile(r'\[(?P<header>.+)\]'), 'a]b'),
+      ):
+      for py2 in (False, True):
+        result = fastparse.scan(text, py2=py2, sectcre=sectcre)
+        self.assertEqual(list(result[1]), [name])
+    class Parser(CP.RawConfigParser):
+      SECTCRE = re.compile(r'\[(?P<header>[^]]+)\]')
+    parser = Parser()
+    self.assertTrue(fastparse.parse(parser, text))
+    self.assertEqual(parser.sections(), ['a'])
+
+  #----------------------------------------------------------------------------
+  def test_py2Rules(self):
+    scan = lambda text: fastparse.scan(text, py2=True)
+    self.assertEqual(
+      scan('[s]\n  # x\nkey = a ; comment\nq = ""\nrem x\nREM y = z\n'), None)
+    result = scan(textwrap.dedent('''\
+      [DEFAULT]
+      a = 1
+      [s]
+      key = a ; comment
+      inline = a;b
+      q = ""
+      multi = 1
+
+        2
+        # not a comment
+      rem comment
+      ; comment
+      [s]
+      key = overridden
+      '''))
+    self.assertEqual(list(result[0].items()), [('a', '1')])
+    self.assertEqual(list(result[1]['s'].items()), [
+      ('__name__', 's'), ('key', 'overridden'), ('inline', 'a;b'), ('q', ''),
+      ('multi', '1\n2\n# not a comment')])
+    self.assertIsNone(scan('  [s]\nkey = 1\n'))
+    self.assertIsNone(scan('[s]\nkey = ;x \n'))
+
+  #----------------------------------------------------------------------------
+  def test_parser(self):
+    files = {
+      'base.ini'   : '[DEFAULT]\nroot = /base\n[app]\npath = %(root)s/app\n  more\n',
+      'config.ini' : '[DEFAULT]\n%inherit = base.ini\n[app]\nkey = %(SUPER:-x)s\n',
+      'bad.ini'    : '[DEFAULT]\n%inherit = base.ini\n[app]\nnovalue\n',
+    }
+    for name in ('config.ini', 'bad.ini'):
+      results = []
+      for fast in (False, True):
+        parser = ConfigParser(loader=ByteLoader(files), fastparse=fast)
+        try:
+          parser.read(name)
+        except CP.Error as err:
+          results.append(type(err))
+          continue
+        results.append([(s, parser.items(s)) for s in parser.sections()])
+      self.assertEqual(results[0], results[1])
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
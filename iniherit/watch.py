@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+File change watchers used by the ``iniherit --watch`` command. All
+watchers implement the same interface:
+
+* ``update(files)``: sets the collection of filenames to watch; this
+  can be called at any time, e.g. after every re-read, so that added
+  or removed ``%inherit`` targets are picked up.
+
+* ``wait(timeout=None)``: blocks until at least one watched file
+  changes (or `timeout` seconds expire) and returns the set of changed
+  filenames (as given to :meth:`update`). Changes that arrive within
+  `debounce` seconds of each other are reported together.
+
+* ``close()``: releases any resources held by the watcher.
+
+Both watchers only report files whose content actually changed (see
+:class:`ChangeDetector`), so e.g. ``touch`` or a git checkout that
+restores identical content does not trigger an update.
+'''
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+from .snapshot import _filehash
+
+log = logging.getLogger(__name__)
+
+__all__ = ('ChangeDetector', 'PollingWatcher', 'InotifyWatcher', 'getWatcher')
+
+#------------------------------------------------------------------------------
+def signature(filename):
+  '''
+  Returns the ``(mtime_ns, size, inode)`` signature of `filename`, or
+  ``None`` if it cannot be `stat`'ed.
+  '''
+  try:
+    stat = os.stat(filename)
+  except (OSError, IOError):
+    return None
+  mtime = getattr(stat, 'st_mtime_ns', None)
+  if mtime is None:
+    mtime = int(stat.st_mtime * 1000000000)
+  return (mtime, stat.st_size, stat.st_ino)
+
+#------------------------------------------------------------------------------
+def _hash(filename):
+  try:
+    return _filehash(filename)
+  except (OSError, IOError):
+    return None
+
+#------------------------------------------------------------------------------
+class ChangeDetector(object):
+  '''
+  Detects content changes of a set of files. A file's stat signature
+  (see :func:`signature`) is checked first, and the file's SHA-1 is
+  only computed when the signature differs, in order to filter out
+  metadata-only changes. The baseline hash is computed when a file is
+  recorded, so that even the first change after that (which may be
+  the only one that a watcher checks) is compared by content.
+
+  Files modified within `racy` seconds of being recorded are always
+  hashed, since an edit within the filesystem's mtime granularity
+  does not necessarily change the signature.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, files=(), racy=2.0):
+    self.racy    = int(racy * 1000000000)
+    # maps filename => [signature, digest, recorded-at]
+    self.entries = dict()
+    self.update(files)
+
+  #----------------------------------------------------------------------------
+  def _isracy(self, entry):
+    return entry[0] is not None and entry[0][0] >= entry[2] - self.racy
+
+  #----------------------------------------------------------------------------
+  def _record(self, filename, sig=None, digest=None):
+    entry = [sig or signature(filename), digest, int(time.time() * 1000000000)]
+    if entry[1] is None and entry[0] is not None:
+      entry[1] = _hash(filename)
+    self.entries[filename] = entry
+
+  #----------------------------------------------------------------------------
+  def update(self, files):
+    '''
+    Sets the files to track. Already tracked files keep their state.
+    '''
+    files = set(files)
+    for name in list(self.entries):
+      if name not in files:
+        del self.entries[name]
+    for name in files:
+      if name not in self.entries:
+        self._record(name)
+
+  #----------------------------------------------------------------------------
+  def changed(self, filename):
+    '''
+    Returns ``True`` if the content of `filename` changed since it was
+    last recorded (or checked), and records the current state.
+    '''
+    entry = self.entries.get(filename)
+    if entry is None:
+      self._record(filename)
+      return True
+    sig = signature(filename)
+    if sig == entry[0] and not self._isracy(entry):
+      return False
+    if sig is None or entry[0] is None:
+      self._record(filename, sig)
+      return sig != entry[0]
+    digest = _hash(filename)
+    self._record(filename, sig, digest)
+    return entry[1] is None or digest != entry[1]
+
+  #----------------------------------------------------------------------------
+  def changes(self, files=None):
+    '''
+    Returns the set of tracked files (or of `files`) that changed.
+    '''
+    if files is None:
+      files = list(self.entries)
+    return set(name for name in files if self.changed(name))
+
+#------------------------------------------------------------------------------
+class PollingWatcher(object):
+  '''
+  Detects changes by checking every watched file every `interval`
+  seconds.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, interval=2.0, debounce=0.1):
+    self.interval = interval
+    self.debounce = debounce
+    self.detector = ChangeDetector()
+
+  #----------------------------------------------------------------------------
+  def update(self, files):
+    self.detector.update(files)
+
+  #----------------------------------------------------------------------------
+  def _changes(self):
+    return self.detector.changes()
+
+  #----------------------------------------------------------------------------
+  def wait(self, timeout=None):
+    expires = None if timeout is None else time.time() + timeout
+    changed = set()
+    while not changed:
+      delay = self.interval
+      if expires is not None:
+        delay = min(delay, expires - time.time())
+        if delay <= 0:
+          return changed
+      time.sleep(delay)
+      log.debug('checking for changes...')
+      changed = self._changes()
+    while self.debounce > 0:
+      time.sleep(self.debounce)
+      more = self._changes()
+      if not more:
+        break
+      changed |= more
+    return changed
+
+  #----------------------------------------------------------------------------
+  def close(self):
+    self.detector.update(())
+
+#------------------------------------------------------------------------------
+IN_MODIFY       = 0x00000002
+IN_ATTRIB       = 0x00000004
+IN_CLOSE_WRITE  = 0x00000008
+IN_MOVED_FROM   = 0x00000040
+IN_MOVED_TO     = 0x00000080
+IN_CREATE       = 0x00000100
+IN_DELETE       = 0x00000200
+IN_DELETE_SELF  = 0x00000400
+IN_MOVE_SELF    = 0x00000800
+IN_Q_OVERFLOW   = 0x00004000
+IN_IGNORED      = 0x00008000
+IN_NONBLOCK     = 0o4000
+IN_CLOEXEC      = 0o2000000
+
+# note: directories are watched instead of the files themselves so
+#       that atomic replacements (write + rename, as done by most
+#       editors) and the creation of previously missing optional
+#       inherits are detected.
+IN_DIRMASK = (
+  IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+  | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+#------------------------------------------------------------------------------
+def _getlibc():
+  global _libc
+  if _libc is None:
+    name = ctypes.util.find_library('c')
+    libc = ctypes.CDLL(name, use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+      raise OSError(errno.ENOSYS, 'inotify is not available')
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    _libc = libc
+  return _libc
+
+#------------------------------------------------------------------------------
+class InotifyWatcher(object):
+  '''
+  Detects changes with the Linux `inotify` API (accessed via
+  `ctypes`), i.e. without any polling. The directories containing the
+  watched files are monitored, and only events for watched files are
+  reported. Raises `OSError` on construction if inotify is not
+  available.
+  '''
+
+  #----------------------------------------------------------------------------
+  def __init__(self, debounce=0.1):
+    self.debounce = debounce
+    self.libc     = _getlibc()
+    self.fd       = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if self.fd < 0:
+      err = ctypes.get_errno()
+      raise OSError(err, os.strerror(err))
+    # maps filename => watched name; dirname => wd; wd => dirname
+    self.files    = dict()
+    self.dirs     = dict()
+    self.wds      = dict()
+    self.detector = ChangeDetector()
+
+  #----------------------------------------------------------------------------
+  def update(self, files):
+    self.files = dict((os.path.abspath(name), name) for name in files)
+    self.detector.update(self.files.values())
+    dirs = set(os.path.dirname(path) for path in self.files)
+    for path in list(self.dirs):
+      if path not in dirs:
+        wd = self.dirs.pop(path)
+        self.wds.pop(wd, None)
+        self.libc.inotify_rm_watch(self.fd, wd)
+    for path in dirs:
+      if path in self.dirs:
+        continue
+      wd = self.libc.inotify_add_watch(
+        self.fd, path.encode('utf-8'), IN_DIRMASK)
+      if wd < 0:
+        log.warning('could not watch directory "%s": %s',
+                    path, os.strerror(ctypes.get_errno()))
+        continue
+      self.dirs[path] = wd
+      self.wds[wd] = path
+
+  #----------------------------------------------------------------------------
+  def _changes(self, timeout):
+    ret = set()
+    ready = select.select([self.fd], [], [], timeout)[0]
+    if not ready:
+      return ret
+    try:
+      data = os.read(self.fd, 65536)
+    except OSError as err:
+      if err.errno == errno.EAGAIN:
+        return ret
+      raise
+    offset = 0
+    while offset + _EVENT.size <= len(data):
+      wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+      offset += _EVENT.size
+      name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+      offset += length
+      if mask & IN_Q_OVERFLOW:
+        ret.update(self.files.values())
+        continue
+      path = self.wds.get(wd)
+      if path is None:
+        continue
+      if mask & IN_IGNORED:
+        # the directory itself went away
+        self.wds.pop(wd, None)
+        self.dirs.pop(path, None)
+      if mask & ( IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED ):
+        ret.update(
+          value for key, value in self.files.items()
+          if os.path.dirname(key) == path)
+        continue
+      target = self.files.get(os.path.join(path, name))
+      if target is not None:
+        ret.add(target)
+    return self.detector.changes(ret)
+
+  #----------------------------------------------------------------------------
+  def wait(self, timeout=None):
+    expires = None if timeout is None else time.time() + timeout
+    changed = set()
+    while not changed:
+      remaining = None
+      if expires is not None:
+        remaining = expires - time.time()
+        if remaining <= 0:
+          return changed
+      changed = self._changes(remaining)
+    while self.debounce > 0:
+      more = self._changes(self.debounce)
+      if not more:
+        break
+      changed |= more
+    return changed
+
+  #----------------------------------------------------------------------------
+  def close(self):
+    if self.fd is not None and self.fd >= 0:
+      os.close(self.fd)
+    self.fd    = None
+    self.dirs  = dict()
+    self.wds   = dict()
+
+#------------------------------------------------------------------------------
+def getWatcher(backend='auto', interval=2.0, debounce=0.1):
+  '''
+  Returns a new watcher for the specified `backend`, which can be
+  ``'inotify'``, ``'poll'`` or ``'auto'`` (the default), which uses
+  inotify if it is available and otherwise falls back to polling.
+  '''
+  if backend in ('auto', 'inotify'):
+    try:
+      return InotifyWatcher(debounce=debounce)
+    except (OSError, AttributeError) as err:
+      if backend == 'inotify':
+        raise
+      log.debug('inotify not available (%s); falling back to polling', err)
+  elif backend != 'poll':
+    raise ValueError('unknown watcher backend: %r' % (backend,))
+  return PollingWatcher(interval=interval, debounce=debounce)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+# file: $Id$
+# auth: Philip J Grabner <grabner@cadit.com>
+# date: 2026/10/18
+# copy: (C) Copyright 2026-EOT Cadit Inc., All Rights Reserved.
+#------------------------------------------------------------------------------
+
+'''
+Streaming output of resolved (flattened) configurations. The emitters
+read the raw (i.e. un-interpolated) option storage of a parser and
+generate the output chunk by chunk, without building any intermediate
+parser. The supported formats are:
+
+* ``ini``: the same output as `ConfigParser.write`, i.e. with the
+  raw (un-interpolated) values.
+* ``json``: a JSON object mapping section names to objects of options.
+* ``env``: ``SECTION_OPTION='value'`` lines, suitable for shell
+  sourcing or env-files.
+* ``python``: a Python dict literal, as for ``json``.
+
+The ``json``, ``env`` and ``python`` formats are consumed by tools
+that do not know INI syntax, and therefore emit the interpolated
+values (as returned by `get`), with the DEFAULT options folded into
+every section.
+'''
+
+import re
+import json
+
+import six
+from six.moves import shlex_quote
+
+from .parser import CP, _rawitems
+
+__all__ = ('FORMATS', 'generate', 'write')
+
+#------------------------------------------------------------------------------
+def _sections(parser):
+  # generates (section, items) for DEFAULT (if non-empty) and then
+  # every section, in the parser's order.
+  defsect = getattr(parser, 'default_section', CP.DEFAULTSECT)
+  items = _rawitems(parser, defsect)
+  if items:
+    yield defsect, items
+  for section in parser._sections:
+    yield section, _rawitems(parser, section)
+
+#------------------------------------------------------------------------------
+def _values(parser):
+  # generates (section, items) as `_sections`, but with interpolated
+  # values and with the DEFAULT options included in every section.
+  defsect = getattr(parser, 'default_section', CP.DEFAULTSECT)
+  # note: on PY2, `RawConfigParser.items` does not interpolate.
+  interpolate = six.PY2 and not isinstance(parser, CP.ConfigParser)
+  def items(section):
+    ret = parser.items(section)
+    if interpolate:
+      ret = [
+        (option, parser._interpolate_with_vars(parser, section, option, value))
+        for option, value in ret]
+    return ret
+  if parser.defaults():
+    yield defsect, items(defsect)
+  for section in parser.sections():
+    yield section, items(section)
+
+#------------------------------------------------------------------------------
+def _explain(parser, section, option):
+  for filename, line, raw in parser.provenance(section, option):
+    yield '# ' + filename + ':' + str(line) + ': ' \
+      + option + ' = ' + raw.replace('\n', '\n#\t') + '\n'
+
+def generate_ini(parser, explain=False):
+  for section, items in _sections(parser):
+    yield '[' + section + ']\n'
+    for option, value in items:
+      if explain:
+        for chunk in _explain(parser, section, option):
+          yield chunk
+      if value is None:
+        yield option + '\n'
+      else:
+        yield option + ' = ' + str(value).replace('\n', '\n\t') + '\n'
+    yield '\n'
+
+#------------------------------------------------------------------------------
+def generate_json(parser):
+  sep = '{\n'
+  for section, items in _values(parser):
+    yield sep + '  ' + json.dumps(section) + ': {'
+    optsep = '\n'
+    for option, value in items:
+      yield optsep + '    ' + json.dumps(option) + ': ' + json.dumps(value)
+      optsep = ',\n'
+    yield '\n  }' if optsep != '\n' else '}'
+    sep = ',\n'
+  yield '{}\n' if sep == '{\n' else '\n}\n'
+
+#------------------------------------------------------------------------------
+_envname_cre = re.compile(r'[^A-Za-z0-9_]+')
+
+def _envname(section, option):
+  return _envname_cre.sub('_', section + '_' + option).upper()
+
+def generate_env(parser):
+  names = dict()
+  for section, items in _values(parser):
+    for option, value in items:
+      name = _envname(section, option)
+      if names.setdefault(name, (section, option)) != (section, option):
+        raise ValueError(
+          'options %r and %r both map to the environment variable %r'
+          % (names[name], (section, option), name))
+      yield name + '=' + shlex_quote('' if value is None else value) + '\n'
+
+#------------------------------------------------------------------------------
+def _pyrepr(value):
+  # note: avoids the "u" prefix of PY2 unicode literals
+  if isinstance(value, six.text_type) and not six.PY3:
+    return repr(value.encode('utf-8'))
+  return repr(value)
+
+def generate_python(parser):
+  yield '{\n'
+  for section, items in _values(parser):
+    yield '  ' + _pyrepr(section) + ': {\n'
+    for option, value in items:
+      yield '    ' + _pyrepr(option) + ': ' + _pyrepr(value) + ',\n'
+    yield '  },\n'
+  yield '}\n'
+
+#------------------------------------------------------------------------------
+FORMATS = {
+  'ini'     : generate_ini,
+  'json'    : generate_json,
+  'env'     : generate_env,
+  'python'  : generate_python,
+}
+
+#------------------------------------------------------------------------------
+def generate(parser, format='ini', explain=False):
+  '''
+  Returns a generator of text chunks that render the resolved content
+  of `parser` in the output `format` (see :data:`FORMATS`). If
+  `explain` is truthy, each option of the "ini" format is preceded by
+  comments listing its provenance (see
+  :meth:`iniherit.IniheritMixin.provenance`).
+  '''
+  if format not in FORMATS:
+    raise ValueError('unknown output format: %r' % (format,))
+  if explain:
+    if format != 'ini':
+      raise ValueError('explanations are only supported by the "ini" format')
+    return generate_ini(parser, explain=True)
+  return FORMATS[format](parser)
+
+#------------------------------------------------------------------------------
+def write(parser, fp, format='ini', explain=False):
+  '''
+  Writes the resolved content of `parser` to the text stream `fp` in
+  the output `format` (see :func:`generate`).
+  '''
+  for chunk in generate(parser, format, explain=explain):
+    fp.write(chunk)
+
+#------------------------------------------------------------------------------
+# end of $Id$
+# $ChangeLog$
+#------------------------------------------------------------------------------
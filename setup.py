@@ -23,6 +23,9 @@ test_requires = [
   'nose                 >= 1.3.0',
   'coverage             >= 3.5.3',
 ]
+if sys.version_info[0] < 3:
+  # needed by the `prefetch_workers` parameter
+  test_requires.append('futures              >= 3.0.0')
 
 requires = [
   'six                  >= 1.6.1',
@@ -54,7 +57,7 @@ setup(
   author_email          = 'oss@cadit.com',
   url                   = 'http://github.com/cadithealth/iniherit',
   keywords              = 'INI inheritance configparser mixin',
-  packages              = setuptools.find_packages(),
+  packages              = setuptools.find_packages(exclude=['bench', 'bench.*']),
   include_package_data  = True,
   zip_safe              = True,
   install_requires      = requires,